@@ -0,0 +1,63 @@
+"""assign_optimal() must find the maximum total score under both capacities."""
+import random
+from itertools import combinations
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy.optimize")
+
+import tools.match_topics as mt
+
+
+def brute_force_total(scored_rows, max_matches, question_capacity):
+    edges = [(t, q, s) for t, row in enumerate(scored_rows) for s, q in row]
+    best = 0.0
+    for r in range(len(edges) + 1):
+        for chosen in combinations(edges, r):
+            per_topic, per_question = {}, {}
+            for t, q, _ in chosen:
+                per_topic[t] = per_topic.get(t, 0) + 1
+                per_question[q] = per_question.get(q, 0) + 1
+            if max(per_topic.values(), default=0) <= max_matches and max(
+                per_question.values(), default=0
+            ) <= question_capacity:
+                best = max(best, sum(s for _, _, s in chosen))
+    return best
+
+
+def random_rows(rng):
+    n_topics, n_questions = rng.randint(1, 5), rng.randint(1, 5)
+    rows = []
+    for _ in range(n_topics):
+        questions = rng.sample(range(n_questions), rng.randint(0, min(3, n_questions)))
+        # Coarse scores, so equal-total alternatives are common
+        rows.append([(rng.choice([0.6, 0.7, 0.8, 0.9, 1.0]), q) for q in sorted(questions)])
+    return rows
+
+
+def test_assign_optimal_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(400):
+        rows = random_rows(rng)
+        max_matches, question_capacity = rng.randint(1, 3), rng.randint(1, 2)
+        out = mt.assign_optimal(rows, max_matches, question_capacity)
+        per_question = {}
+        for row, picked in zip(rows, out):
+            assert len(picked) <= max_matches
+            assert len({q for _, q in picked}) == len(picked)
+            assert set(picked) <= set(row)
+            for _, q in picked:
+                per_question[q] = per_question.get(q, 0) + 1
+        assert max(per_question.values(), default=0) <= question_capacity
+        total = sum(s for picked in out for s, _ in picked)
+        assert total == pytest.approx(brute_force_total(rows, max_matches, question_capacity)), (
+            rows,
+            max_matches,
+            question_capacity,
+        )
+
+
+def test_assign_optimal_with_free_capacity_is_greedy():
+    rows = [[(0.9, 0), (0.7, 1), (0.8, 2)], [(0.6, 1)], []]
+    assert mt.assign_optimal(rows, 2, question_capacity=2) == [[(0.9, 0), (0.8, 2)], [(0.6, 1)], []]
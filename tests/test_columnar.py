@@ -0,0 +1,49 @@
+"""write_table() may only replace a previous table, never other files."""
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from tools import columnar
+
+
+def test_write_table_replaces_only_tables(tmp_path):
+    table = str(tmp_path / "slides.cols")
+    columnar.write_slides(table, [(1, "Intro"), (None, "Agenda")])
+    columnar.write_slides(table, [(2, "Apriori")])
+    assert columnar.read_slides(table) == [(2, "Apriori")]
+
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    columnar.write_exam(str(empty), ["What is support?"])
+    assert columnar.read_exam(str(empty)) == ["What is support?"]
+
+
+@pytest.mark.parametrize("layout", ["file", "dir", "table-with-extra-file"])
+def test_write_table_refuses_other_paths(tmp_path, layout):
+    target = tmp_path / "out"
+    if layout == "file":
+        target.write_text("keep")
+        keep = target
+    else:
+        if layout == "dir":
+            target.mkdir()
+        else:
+            columnar.write_exam(str(target), ["q"])
+        keep = target / "important.txt"
+        keep.write_text("keep")
+    with pytest.raises(ValueError, match="refusing to replace"):
+        columnar.write_exam(str(target), ["q"])
+    with pytest.raises(ValueError, match="refusing to replace"):
+        columnar.write_exam(str(target) + os.sep, ["q"])
+    assert keep.read_text() == "keep"
+    assert sorted(os.listdir(tmp_path)) == ["out"]  # no temporary directory left behind
+
+
+def test_readers_check_the_table_kind(tmp_path):
+    exam = str(tmp_path / "exam.cols")
+    columnar.write_exam(exam, ["Was ist Häufigkeit?", "", "π ≈ 3.14"])
+    assert columnar.read_exam(exam) == ["Was ist Häufigkeit?", "", "π ≈ 3.14"]
+    with pytest.raises(ValueError, match="expected 'slides'"):
+        columnar.read_slides(exam)
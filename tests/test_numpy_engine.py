@@ -0,0 +1,40 @@
+"""score_pairs_numpy() must reproduce combined_score() for every pair."""
+import glob
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy.sparse")
+
+import tools.match_topics as mt
+from conftest import REPO_DIR
+
+
+def assert_scores_match(norm_topics, norm_exam):
+    rows = list(mt.score_pairs_numpy(norm_topics, norm_exam, 0.0, candidates="all"))
+    assert len(rows) == len(norm_topics)
+    for topic, row in zip(norm_topics, rows):
+        # min-score 0 keeps every pair, in question order
+        assert [q for _, q in row] == list(range(len(norm_exam)))
+        for s, q in row:
+            assert s == pytest.approx(mt.combined_score(topic, norm_exam[q]), abs=1e-9), (topic, norm_exam[q])
+
+
+def test_numpy_scores_equal_combined_score_on_data():
+    normalizer = mt.AliasNormalizer(mt.load_aliases(os.path.join(REPO_DIR, "data", "aliases.json")))
+    topics = [
+        topic
+        for path in sorted(glob.glob(os.path.join(REPO_DIR, "data", "slides_topics__*.txt")))
+        for _, topic in mt.parse_slides(mt.load_lines(path))
+    ]
+    exam = mt.parse_exam(mt.load_lines(os.path.join(REPO_DIR, "data", "exam_questions.txt")))
+    unique_topics, _ = mt.group_topics([normalizer(t) for t in topics])
+    assert_scores_match(unique_topics, [normalizer(q) for q in exam])
+
+
+def test_numpy_scores_equal_combined_score_on_edge_cases():
+    texts = ["", "data", "data data", "data mining data", "mining data", "a a a b", "b", "k means", "kmeans", "x y z x"]
+    assert_scores_match(texts, texts)
+    assert_scores_match(texts, [])
+    assert_scores_match([], texts)
@@ -0,0 +1,40 @@
+"""The cached LSA model must survive input changes, so only new texts are embedded."""
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy.sparse.linalg")
+
+from tools import semantic
+
+CORPUS = [
+    "decision tree classifier",
+    "naive bayes classifier",
+    "k means clustering",
+    "association rule mining apriori",
+    "support vector machine margin",
+]
+
+
+def test_new_texts_are_folded_into_the_cached_model(tmp_path):
+    cache_dir = str(tmp_path)
+    model = semantic.load_model("lsa", cache_dir, CORPUS, dim=3)
+    semantic.EmbeddingCache(cache_dir, model.model_id).embed(model, CORPUS)
+
+    again = semantic.load_model("lsa", cache_dir, CORPUS + ["decision tree pruning"], dim=3)
+    assert again.model_id == model.model_id
+    cache = semantic.EmbeddingCache(cache_dir, again.model_id)
+    cache.embed(again, CORPUS + ["decision tree pruning"])
+    assert (cache.hits, cache.misses) == (len(CORPUS), 1)
+
+
+def test_unfamiliar_corpus_refits_and_drops_old_vectors(tmp_path):
+    cache_dir = str(tmp_path)
+    model = semantic.load_model("lsa", cache_dir, CORPUS, dim=3)
+    semantic.EmbeddingCache(cache_dir, model.model_id).embed(model, CORPUS)
+
+    other = ["xylophone quartet", "zephyr wind", "quokka marsupial", "yodel echo"]
+    refitted = semantic.load_model("lsa", cache_dir, other, dim=3)
+    assert refitted.model_id != model.model_id
+    assert sorted(os.listdir(cache_dir)) == ["lsa-3.npz"]
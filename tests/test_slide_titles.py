@@ -0,0 +1,91 @@
+"""title_for_lines() must pick the same titles as the original sort-based implementation."""
+import glob
+import os
+import random
+from typing import List
+
+import pytest
+
+pytest.importorskip("pdfminer")
+
+from conftest import REPO_DIR
+from tools.extract_slide_titles import extract_titles, title_for_lines, titles_from_table
+from tools.layout import TableLine, build_table
+from tools.match_topics import chapter_slug
+
+
+def reference_title_for_lines(
+    lines: List[TableLine], page_height: float, top_ratio: float = 0.35, merge_threshold: float = 0.9
+) -> str:
+    """The implementation title_for_lines() replaced: full sorts instead of a bisect walk."""
+    if not page_height:
+        page_height = 842.0
+    lines = [ln for ln in lines if ln.avg_size is not None]
+    if not lines:
+        return ""
+    top_cut = page_height * (1 - top_ratio)
+    top_lines = [ln for ln in lines if ln.y1 >= top_cut]
+    if not top_lines:
+        top_lines = lines  # sorted in place below, which also reorders the merge candidates
+    top_lines.sort(key=lambda ln: (ln.avg_size, ln.y1), reverse=True)
+    title = top_lines[0]
+    candidates_below = [ln for ln in lines if ln.y0 < title.y0]
+    candidates_below.sort(key=lambda ln: abs(ln.y1 - title.y0))
+    for ln in candidates_below:
+        size_similarity = min(title.avg_size, ln.avg_size) / max(title.avg_size, ln.avg_size)
+        vertically_close = (title.y0 - ln.y1) <= (title.avg_size * 1.6)
+        horizontally_aligned = abs(ln.x0 - title.x0) <= max(10.0, title.avg_size * 0.8)
+        if size_similarity >= merge_threshold and vertically_close and horizontally_aligned:
+            return f"{title.text} {ln.text}".strip()
+    return title.text
+
+
+def random_page(rng: random.Random) -> List[TableLine]:
+    # Coarse grids and few distinct sizes, so positions and font sizes tie often
+    grid = rng.choice([1.0, 5.0, 0.5])
+    lines = []
+    for i in range(rng.randint(0, 25)):
+        y0 = rng.randint(0, 100) * grid
+        y1 = y0 + rng.choice([0, 5, 10, 12, 20])
+        size = rng.choice([None, 10.0, 11.0, 12.0, 20.0, 24.0])
+        lines.append(TableLine(1, f"l{i}", rng.choice([0.0, 5.0, 20.0, 50.0]), y0, 100.0, y1, size))
+    return lines
+
+
+def test_title_for_lines_matches_reference_on_random_pages():
+    rng = random.Random(1)
+    for _ in range(5000):
+        lines = random_page(rng)
+        page_height = rng.choice([0.0, 540.0, 120.0])
+        for top_ratio, merge_threshold in ((0.35, 0.9), (0.5, 0.5), (0.2, 0.95)):
+            expected = reference_title_for_lines(list(lines), page_height, top_ratio, merge_threshold)
+            assert title_for_lines(lines, page_height, top_ratio, merge_threshold) == expected, (
+                lines,
+                page_height,
+                top_ratio,
+                merge_threshold,
+            )
+
+
+DECKS = sorted(
+    pdf
+    for pdf in glob.glob(os.path.join(REPO_DIR, "slides", "*.pdf"))
+    if os.path.exists(os.path.join(REPO_DIR, "data", f"slides_topics__{chapter_slug(pdf)}.txt"))
+)
+
+
+@pytest.mark.parametrize("pdf", DECKS, ids=os.path.basename)
+def test_titles_from_table_reproduce_data(pdf):
+    # The title-region layout (extract_slide_titles.py --fast) keeps the test quick
+    table = build_table(pdf, title_region=0.35)
+    with open(os.path.join(REPO_DIR, "data", f"slides_topics__{chapter_slug(pdf)}.txt"), encoding="utf-8") as f:
+        expected = f.read().splitlines()
+    assert [f"{page}|{title}" for page, title in titles_from_table(table)] == expected
+
+
+def test_extract_titles_full_layout_reproduces_data():
+    # The default (whole-page) layout of extract_titles(); the smallest bundled deck keeps it quick
+    pdf = os.path.join(REPO_DIR, "slides", "Chapter 4 - Rare patterns.pdf")
+    with open(os.path.join(REPO_DIR, "data", f"slides_topics__{chapter_slug(pdf)}.txt"), encoding="utf-8") as f:
+        expected = f.read().splitlines()
+    assert [f"{page}|{title}" for page, title in extract_titles(pdf)] == expected
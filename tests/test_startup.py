@@ -0,0 +1,31 @@
+"""Importing tools.match_topics must not pull in the modules it imports lazily."""
+import subprocess
+import sys
+
+from conftest import REPO_DIR
+
+LAZY_MODULES = ["difflib", "csv", "json", "concurrent.futures"]
+
+
+def test_match_topics_import_stays_light():
+    # A fresh interpreter: pytest itself has most of these imported already
+    code = f"import sys, tools.match_topics; print(*(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == []
+
+
+# Loose on purpose: CI machines are noisy. Track the real figure with
+# `python3 tools/bench.py --sizes '' --pdf-pages '' --startup-budget-ms 60`.
+STARTUP_BUDGET_S = 0.25
+
+
+def test_match_topics_import_time_within_budget():
+    best = float("inf")
+    for _ in range(5):
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import tools.match_topics"],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True,
+        )
+        # last line: "import time: self | cumulative | tools.match_topics" (microseconds)
+        best = min(best, int(out.stderr.strip().split("\n")[-1].split("|")[1]) / 1e6)
+    assert best < STARTUP_BUDGET_S, f"import tools.match_topics took {best * 1000:.0f} ms"
@@ -0,0 +1,38 @@
+"""Slide/exam extraction and topic matching.
+
+Each module also runs as a script (`python3 tools/<module>.py`). The package
+re-exports the library API; the extractors import pdfminer, so their names
+are resolved on first use. The match_topics() function is exported as
+match_slide_topics, so that `tools.match_topics` stays the submodule.
+"""
+from .match_topics import (
+    AliasNormalizer,
+    SemanticEngine,
+    combined_score,
+    load_aliases,
+    match_chapters,
+    normalize,
+    parse_exam,
+    parse_slides,
+    score_chapters,
+    sweep,
+    write_csv,
+)
+from .match_topics import match_topics as match_slide_topics
+
+_LAZY = {
+    "extract_titles": "extract_slide_titles",
+    "extract_titles_batch": "extract_slide_titles",
+    "collect_ordered_lines": "extract_exam_questions",
+    "extract_questions": "extract_exam_questions",
+    "extract_questions_from_pdf": "extract_exam_questions",
+    "iter_questions_from_pdf": "extract_exam_questions",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+
+        return getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
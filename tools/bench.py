@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Benchmark the extraction and matching hot paths on synthetic and real data.
+
+Stages: startup (match_topics import time and a one-chapter CLI lookup,
+each in a fresh interpreter), normalize, combined_score, match_topics,
+extract_titles (full and --fast layout) and extract_questions. Synthetic corpora reuse the vocabulary of data/;
+slide topics scale from --sizes and exam questions from --banks (e.g. both
+100..100000, paired case by case); synthetic multi-page PDFs are written
+with a minimal built-in PDF writer. The real data/ files are always run as a
+baseline case. Each measurement reports wall time, peak traced memory and
+items (pairs, texts or pages) per second; --json writes the results so runs
+can be compared across commits (--compare OLD.json).
+
+Usage:
+  python3 tools/bench.py --sizes 100,1000,10000 --pdf-pages 10,100 --json bench.json
+  python3 tools/bench.py --sizes 1000,1000 --banks 1000,100000 --engines python,numpy --pdf-pages ''
+  python3 tools/bench.py --compare bench.json
+  python3 tools/bench.py --sizes '' --pdf-pages '' --startup-budget-ms 60   # exit 1 if the import is slower
+
+Extraction stages need pdfminer.six and are skipped without it.
+"""
+import argparse
+import glob
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+if __package__ in (None, ""):
+    # Run as a script: make the `tools` package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools.match_topics as mt
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cold() -> None:
+    # Drop memoized normalizers and matchers so every measurement starts cold
+    mt._normalizers.clear()
+    mt._matcher.cache_clear()
+
+
+def measure(fn: Callable[[], object], memory: bool = True) -> Tuple[float, Optional[int]]:
+    """Wall time of one call and, optionally, peak traced memory of a second call."""
+    cold()
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        cold()
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def load_real_corpus() -> Tuple[List[Tuple[Optional[int], str]], List[str]]:
+    slides: List[Tuple[Optional[int], str]] = []
+    for path in sorted(glob.glob(os.path.join(REPO_DIR, "data", "slides_topics__*.txt"))):
+        slides.extend(mt.parse_slides(mt.load_lines(path)))
+    exam = mt.parse_exam(mt.load_lines(os.path.join(REPO_DIR, "data", "exam_questions.txt")))
+    return slides, exam
+
+
+def synthetic_texts(vocab: List[str], n: int, rng: random.Random, lo: int, hi: int, question: bool = False) -> List[str]:
+    out = []
+    for _ in range(n):
+        words = [rng.choice(vocab) for _ in range(rng.randint(lo, hi))]
+        text = " ".join(words).capitalize()
+        out.append(text + "?" if question else text)
+    return out
+
+
+def write_synthetic_pdf(path: str, pages: int, rng: random.Random, vocab: List[str]) -> None:
+    """Slide-like PDF: a large title near the top and numbered questions below, per page."""
+
+    def esc(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects: List[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for _ in range(pages):
+        ops = [f"BT /F1 24 Tf 40 540 Td ({esc(' '.join(rng.choice(vocab) for _ in range(4)).title())}) Tj ET"]
+        y = 470
+        for i in range(1, rng.randint(4, 9)):
+            words = " ".join(rng.choice(vocab) for _ in range(rng.randint(4, 10)))
+            ops.append(f"BT /F1 12 Tf 50 {y} Td ({i}. {esc(words)}?) Tj ET")
+            y -= 40
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 720 576] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def bench_matching(
+    case: str,
+    slides: List[Tuple[Optional[int], str]],
+    exam: List[str],
+    aliases: Dict[str, List[str]],
+    args,
+) -> List[Dict]:
+    texts = [t for _, t in slides] + exam
+    rows = []
+
+    def run_normalize():
+        normalizer = mt.AliasNormalizer(aliases)
+        return [normalizer(t) for t in texts]
+
+    seconds, peak = measure(run_normalize, args.memory)
+    rows.append(result("normalize", case, len(texts), "texts", seconds, peak))
+
+    normalizer = mt.AliasNormalizer(aliases)
+    norm_topics = [normalizer(t) for _, t in slides]
+    norm_exam = [normalizer(q) for q in exam]
+    rng = random.Random(args.seed)
+    n_pairs = min(len(norm_topics) * len(norm_exam), args.score_pairs)
+    pairs = [(rng.choice(norm_topics), rng.choice(norm_exam)) for _ in range(n_pairs)]
+    seconds, peak = measure(lambda: [mt.combined_score(a, b) for a, b in pairs], args.memory)
+    rows.append(result("combined_score", case, n_pairs, "pairs", seconds, peak))
+
+    for engine in args.engines:
+        def run():
+            return mt.match_topics(
+                slides, exam, aliases, min_score=args.min_score, max_matches=args.max_matches,
+                candidates=args.candidates, engine=engine,
+            )
+
+        seconds, peak = measure(run, args.memory)
+        rows.append(
+            result(f"match_topics[{engine}]", case, len(slides) * len(exam), "pairs", seconds, peak)
+        )
+    return rows
+
+
+def bench_startup(args) -> List[Dict]:
+    """Best of --startup-runs fresh interpreters: `import tools.match_topics` and a one-chapter lookup."""
+    imports = []
+    for _ in range(args.startup_runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import tools.match_topics"],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True,
+        )
+        # last line: "import time: self | cumulative | tools.match_topics" (microseconds)
+        imports.append(int(proc.stderr.strip().splitlines()[-1].split("|")[1]) / 1e6)
+    rows = [result("startup[import]", "match_topics", 1, "runs", min(imports), None)]
+
+    slides = min(glob.glob(os.path.join(REPO_DIR, "data", "slides_topics__*.txt")), key=os.path.getsize)
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd = [
+            sys.executable, os.path.join(REPO_DIR, "tools", "match_topics.py"),
+            "--slides", slides, "--exam", os.path.join(REPO_DIR, "data", "exam_questions.txt"),
+            "--aliases", args.aliases, "--out", os.path.join(tmp, "out.csv"), "--norm-cache", tmp,
+        ]
+        subprocess.run(cmd, check=True, capture_output=True)  # writes the normalizer snapshot
+        lookups = []
+        for _ in range(args.startup_runs):
+            start = time.perf_counter()
+            subprocess.run(cmd, check=True, capture_output=True)
+            lookups.append(time.perf_counter() - start)
+    rows.append(result("startup[lookup]", os.path.basename(slides)[:18], 1, "runs", min(lookups), None))
+    return rows
+
+
+def bench_extraction(case: str, pdf: str, pages: int, args) -> List[Dict]:
+    from tools.extract_exam_questions import extract_questions_from_pdf
+    from tools.extract_slide_titles import extract_titles
+
+    return [
+        result("extract_titles", case, pages, "pages", *measure(lambda: extract_titles(pdf), args.memory)),
+        result(
+            "extract_titles[fast]", case, pages, "pages",
+            *measure(lambda: extract_titles(pdf, fast=True), args.memory),
+        ),
+        result(
+            "extract_questions", case, pages, "pages",
+            *measure(lambda: extract_questions_from_pdf(pdf), args.memory),
+        ),
+    ]
+
+
+def result(stage: str, case: str, n: int, unit: str, seconds: float, peak: Optional[int]) -> Dict:
+    row = {
+        "stage": stage,
+        "case": case,
+        "n": n,
+        "unit": unit,
+        "seconds": round(seconds, 6),
+        "per_second": round(n / seconds, 1) if seconds > 0 else None,
+        "peak_kb": round(peak / 1024, 1) if peak is not None else None,
+    }
+    print(
+        f"{stage:<22} {case:<24} {n:>10} {unit:<6} {seconds:>9.3f}s "
+        f"{row['per_second'] or 0:>12.1f}/s  peak={row['peak_kb'] if peak is not None else '-'} KiB",
+        flush=True,
+    )
+    return row
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def compare(old_path: str, rows: List[Dict]) -> None:
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {(r["stage"], r["case"]): r for r in json.load(f)["results"]}
+    print(f"\nComparison with {old_path} (old seconds / new seconds):")
+    for r in rows:
+        prev = old.get((r["stage"], r["case"]))
+        if prev and r["seconds"]:
+            print(f"  {r['stage']:<22} {r['case']:<24} {prev['seconds'] / r['seconds']:>7.2f}x")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark extraction and matching stages")
+    ap.add_argument("--sizes", default="100,1000", help="Comma-separated synthetic corpus sizes (slide topics)")
+    ap.add_argument(
+        "--banks",
+        help="Comma-separated synthetic exam bank sizes, one per --sizes entry (default: the same as --sizes)",
+    )
+    ap.add_argument("--pdf-pages", default="10", help="Comma-separated synthetic PDF page counts ('' to skip)")
+    ap.add_argument("--real-pdfs", action="store_true", help="Also extract slides/*.pdf and Exam_Questions_Summary.pdf")
+    ap.add_argument("--aliases", default=os.path.join(REPO_DIR, "data", "aliases.json"))
+    ap.add_argument("--engines", default="python", help="Comma-separated match_topics engines")
+    ap.add_argument("--candidates", choices=mt.CANDIDATE_MODES, default="certified")
+    ap.add_argument("--min-score", type=float, default=0.6)
+    ap.add_argument("--max-matches", type=int, default=3)
+    ap.add_argument("--score-pairs", type=int, default=20000, help="Random pairs for the combined_score stage")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--no-memory", dest="memory", action="store_false", help="Skip the traced peak-memory run")
+    ap.add_argument("--startup-runs", type=int, default=5, help="Fresh interpreters per startup measurement")
+    ap.add_argument(
+        "--startup-budget-ms",
+        type=float,
+        help="Exit with status 1 if importing tools.match_topics takes longer than this",
+    )
+    ap.add_argument("--json", help="Write results as JSON to this path")
+    ap.add_argument("--compare", help="Previous --json output to compare against")
+    args = ap.parse_args()
+    args.engines = [e for e in args.engines.split(",") if e]
+    sizes = [int(x) for x in args.sizes.split(",") if x]
+    banks = sizes if args.banks is None else [int(x) for x in args.banks.split(",") if x]
+    if len(banks) != len(sizes):
+        ap.error(f"--banks needs one bank size per --sizes entry ({len(sizes)}), got {len(banks)}")
+
+    aliases = mt.load_aliases(args.aliases)
+    slides, exam = load_real_corpus()
+    vocab = sorted({w for t in [t for _, t in slides] + exam for w in t.split() if w.isalpha()})
+    rng = random.Random(args.seed)
+
+    rows = bench_startup(args)
+    rows.extend(bench_matching("data", slides, exam, aliases, args))
+    for size, bank in zip(sizes, banks):
+        syn_slides = list(enumerate(synthetic_texts(vocab, size, rng, 2, 7), start=1))
+        syn_exam = synthetic_texts(vocab, bank, rng, 3, 12, question=True)
+        rows.extend(bench_matching(f"synthetic-{size}x{bank}", syn_slides, syn_exam, aliases, args))
+
+    pdf_pages = [int(x) for x in args.pdf_pages.split(",") if x]
+    if pdf_pages or args.real_pdfs:
+        try:
+            importlib.import_module("pdfminer")
+        except ImportError:
+            print("pdfminer.six not installed: skipping extraction stages")
+            pdf_pages, args.real_pdfs = [], False
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in pdf_pages:
+            pdf = os.path.join(tmp, f"synthetic_{pages}.pdf")
+            write_synthetic_pdf(pdf, pages, rng, vocab)
+            rows.extend(bench_extraction(f"synthetic-{pages}p", pdf, pages, args))
+    if args.real_pdfs:
+        from pdfminer.pdfpage import PDFPage
+
+        pdfs = sorted(glob.glob(os.path.join(REPO_DIR, "slides", "*.pdf")))
+        pdfs.append(os.path.join(REPO_DIR, "Exam_Questions_Summary.pdf"))
+        for pdf in pdfs:
+            with open(pdf, "rb") as f:
+                pages = sum(1 for _ in PDFPage.get_pages(f))
+            rows.extend(bench_extraction(os.path.basename(pdf)[:18], pdf, pages, args))
+
+    report = {
+        "meta": {
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+        },
+        "results": rows,
+    }
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to: {args.json}")
+    if args.compare:
+        compare(args.compare, rows)
+    if args.startup_budget_ms is not None:
+        import_ms = 1000 * rows[0]["seconds"]
+        if import_ms > args.startup_budget_ms:
+            print(f"\nStartup budget exceeded: import tools.match_topics took {import_ms:.1f} ms > {args.startup_budget_ms:g} ms")
+            sys.exit(1)
+        print(f"\nStartup budget met: {import_ms:.1f} ms <= {args.startup_budget_ms:g} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Columnar on-disk tables for slides, exam items and match results.
+
+A table is a directory (by convention `*.cols`) holding one `.npy` file per
+numeric column, and per text column a single UTF-8 buffer
+(`<name>.data.npy`, uint8) plus row offsets (`<name>.offsets.npy`, int64).
+`meta.json` records the kind, row count and column types. Table opens the
+arrays memory-mapped and decodes text per row on access. read_slides() and
+read_exam() decode every row into Python lists for matching; that is one
+UTF-8 decode per value, with no line splitting or parsing.
+
+  slides: page (int64, -1 = no page), title (str)
+  exam:   text (str)
+  pairs:  [source (str)], page (int64), slide_topic, exam_question (str), score (float64), confidence (str)
+
+Requires numpy. CSV stays the export format:
+  python3 tools/columnar.py to-csv results/mapped_topics.cols results/mapped_topics.csv
+  python3 tools/columnar.py from-text slides data/slides_topics__chapter_2_-_data.txt data/slides_topics__chapter_2_-_data.cols
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FORMAT = "tools-columnar/1"
+
+
+def is_table(path: str) -> bool:
+    """A table directory written by write_table()."""
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+class TextColumn(Sequence):
+    """Strings stored as one UTF-8 buffer plus offsets; values are decoded on access."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.data[start:stop].tobytes().decode("utf-8")
+
+    def tolist(self) -> List[str]:
+        """All values, decoded from one copy of the buffer (much faster than indexing row by row)."""
+        buf = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        return [buf[start:stop].decode("utf-8") for start, stop in zip(offsets, offsets[1:])]
+
+
+class Table:
+    def __init__(self, path: str, kind: Optional[str] = None):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT:
+            raise ValueError(f"{path}: not a {FORMAT} table")
+        self.path = path
+        self.kind: str = meta["kind"]
+        if kind is not None and self.kind != kind:
+            raise ValueError(f"{path}: table of kind {self.kind!r}, expected {kind!r}")
+        self.types: Dict[str, str] = meta["columns"]
+        self.rows: int = meta["rows"]
+        self.columns: Dict[str, Sequence] = {}
+        for name, kind in self.types.items():
+            if kind == "str":
+                self.columns[name] = TextColumn(
+                    np.load(os.path.join(path, f"{name}.data.npy"), mmap_mode="r"),
+                    np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode="r"),
+                )
+            else:
+                self.columns[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, name: str) -> Sequence:
+        return self.columns[name]
+
+    def records(self) -> Iterator[Dict]:
+        cols = [(name, self.columns[name], self.types[name]) for name in self.types]
+        for i in range(self.rows):
+            yield {name: col[i] if kind == "str" else col[i].item() for name, col, kind in cols}
+
+
+def table_files(path: str) -> List[str]:
+    """The files write_table() puts into the table at path, per its meta.json."""
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        types = json.load(f).get("columns", {})
+    names = ["meta.json"]
+    for name, kind in types.items():
+        names += [f"{name}.data.npy", f"{name}.offsets.npy"] if kind == "str" else [f"{name}.npy"]
+    return names
+
+
+def check_target(path: str) -> None:
+    """Raise ValueError unless path is free, an empty directory or a table holding nothing else.
+
+    write_table() replaces the whole directory, so anything else found there
+    (a data/ folder given as --out, a stray file inside an old table) is
+    refused rather than deleted.
+    """
+    path = path.rstrip("/") or path
+    if not os.path.lexists(path):
+        return
+    if os.path.isdir(path) and not os.path.islink(path):
+        entries = set(os.listdir(path))
+        if not entries or (is_table(path) and entries <= set(table_files(path))):
+            return
+    raise ValueError(f"{path}: exists and is not a columnar table; refusing to replace it")
+
+
+def write_table(path: str, kind: str, columns: Dict[str, Tuple[str, List]]) -> None:
+    """Write {name: (type, values)} with type "str", "int64" or "float64"; replaces an existing table."""
+    check_target(path)
+    rows = {len(values) for _, values in columns.values()}
+    if len(rows) > 1:
+        raise ValueError(f"columns of {path} differ in length: {sorted(rows)}")
+    path = path.rstrip("/") or path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp, 0o777 & ~umask)  # mkdtemp() creates it private
+    for name, (col_type, values) in columns.items():
+        if col_type == "str":
+            encoded = [v.encode("utf-8") for v in values]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+            np.save(os.path.join(tmp, f"{name}.data.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+            np.save(os.path.join(tmp, f"{name}.offsets.npy"), offsets)
+        else:
+            np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(values, dtype=col_type))
+    meta = {
+        "format": FORMAT,
+        "kind": kind,
+        "rows": rows.pop() if rows else 0,
+        "columns": {name: col_type for name, (col_type, _) in columns.items()},
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    if os.path.isdir(path):
+        shutil.rmtree(path)  # a table or an empty directory, see check_target()
+    os.replace(tmp, path)
+
+
+def write_slides(path: str, slides: List[Tuple[Optional[int], str]]) -> None:
+    write_table(
+        path,
+        "slides",
+        {
+            "page": ("int64", [-1 if page is None else page for page, _ in slides]),
+            "title": ("str", [title for _, title in slides]),
+        },
+    )
+
+
+def read_slides(path: str) -> List[Tuple[Optional[int], str]]:
+    table = Table(path, "slides")
+    pages = table["page"].tolist()
+    return [(None if page < 0 else page, title) for page, title in zip(pages, table["title"].tolist())]
+
+
+def write_exam(path: str, items: List[str]) -> None:
+    write_table(path, "exam", {"text": ("str", items)})
+
+
+def read_exam(path: str) -> List[str]:
+    return Table(path, "exam")["text"].tolist()
+
+
+PAIR_TYPES = {"source": "str", "page": "int64", "slide_topic": "str", "exam_question": "str", "score": "float64", "confidence": "str"}
+
+
+def write_pairs(path: str, rows: List[Dict], fieldnames: List[str]) -> None:
+    """Match results (the CSV rows) as a table with the same columns."""
+    columns: Dict[str, Tuple[str, List]] = {}
+    for name in fieldnames:
+        values = [r[name] for r in rows]
+        if name == "page":
+            values = [-1 if v is None else v for v in values]
+        columns[name] = (PAIR_TYPES[name], values)
+    write_table(path, "pairs", columns)
+
+
+def to_csv(path: str, out: str) -> int:
+    table = Table(path)
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(table.types))
+        writer.writeheader()
+        for r in table.records():
+            if "page" in r and r["page"] < 0:
+                r["page"] = None
+            writer.writerow(r)
+    return len(table)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Convert between columnar tables and text/CSV")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("to-csv", help="Export a table as CSV")
+    p.add_argument("table")
+    p.add_argument("out")
+    p = sub.add_parser("from-text", help="Build a slides/exam table from a data/*.txt file")
+    p.add_argument("kind", choices=["slides", "exam"])
+    p.add_argument("txt")
+    p.add_argument("out")
+    args = ap.parse_args()
+
+    if args.cmd == "to-csv":
+        n = to_csv(args.table, args.out)
+        print(f"Wrote {args.out}  (rows={n})")
+        return
+    try:
+        from .match_topics import load_lines, parse_exam, parse_slides
+    except ImportError:
+        from match_topics import load_lines, parse_exam, parse_slides
+    lines = load_lines(args.txt)
+    if args.kind == "slides":
+        slides = parse_slides(lines)
+        write_slides(args.out, slides)
+        n = len(slides)
+    else:
+        items = parse_exam(lines)
+        write_exam(args.out, items)
+        n = len(items)
+    print(f"Wrote {args.out}  (rows={n})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Content-addressed cache for PDF extraction output.
+
+Entries are keyed on the SHA-256 of the PDF bytes, the extractor parameters
+(e.g. --top-ratio, --merge-threshold) and the extractor version (a hash of
+the extractor script and the modules it depends on), and hold the text the extractor wrote (`page|title`
+lines or exam items). The cache directory is bounded in size; the least
+recently used entries are evicted first (hits refresh an entry's mtime).
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Optional, Sequence
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, cache_dir: str = ".cache/extract", max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, kind: str, pdf_path: str, params: Dict, extractor: str, deps: Sequence[str] = ()) -> str:
+        """deps: further source files the extractor output depends on (e.g. the shared layout layer)."""
+        entry = {
+            "kind": kind,
+            "pdf": file_digest(pdf_path),
+            "params": params,
+            "extractor": file_digest(extractor),
+        }
+        if deps:
+            entry["deps"] = [file_digest(path) for path in deps]
+        payload = json.dumps(entry, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)  # mark as recently used
+        self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self.path(key) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, self.path(key))
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".txt"):
+                continue
+            st = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
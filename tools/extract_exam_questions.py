@@ -13,79 +13,85 @@ Heuristics:
   - Starts a new item when encountering bullets/numbers or large vertical gaps.
   - Ends an item when encountering '?' or another clear bullet/numbered start.
   - Keeps formula characters as emitted by pdfminer (best-available text fidelity).
+  - Streams: pages are laid out and sorted one at a time and items are written
+    as they are finalized, so pdfminer memory is bounded by the largest page.
+  - Lines come from the shared line table (tools/layout.py); with
+    --layout-cache a PDF laid out before skips pdfminer.
 """
 import argparse
 import os
 import re
-from dataclasses import dataclass
-from typing import List, Tuple
-
-from pdfminer.high_level import extract_pages
-from pdfminer.layout import LTChar, LTTextBox, LTTextContainer, LTTextLine, LTTextLineHorizontal
-
-
-@dataclass
-class Line:
-    page: int
-    text: str
-    x0: float
-    y0: float
-    x1: float
-    y1: float
-    avg_size: float
-
-
-def iter_lines(layout) -> List[LTTextLine]:
-    out = []
-    for element in layout:
-        if isinstance(element, LTTextBox):
-            for line in element:
-                if isinstance(line, (LTTextLine, LTTextLineHorizontal)):
-                    out.append(line)
-        elif isinstance(element, LTTextContainer):
-            for line in element:
-                if isinstance(line, (LTTextLine, LTTextLineHorizontal)):
-                    out.append(line)
-    return out
-
-
-def avg_font_size(line: LTTextLine) -> float:
-    sizes = [obj.size for obj in getattr(line, "_objs", []) if isinstance(obj, LTChar)]
-    return sum(sizes) / len(sizes) if sizes else 0.0
-
-
-def collect_ordered_lines(pdf_path: str) -> List[Line]:
-    lines: List[Line] = []
-    for page_idx, layout in enumerate(extract_pages(pdf_path), start=1):
-        for line in iter_lines(layout):
-            text = line.get_text().strip()
-            if not text:
-                continue
-            x0, y0, x1, y1 = line.bbox
-            lines.append(Line(page_idx, text, x0, y0, x1, y1, avg_font_size(line)))
-    # Sort visual order: page asc, y desc (top first), x asc
-    lines.sort(key=lambda l: (l.page, -l.y1, l.x0))
-    return lines
+import sys
+from typing import Iterable, Iterator, List, Optional
+
+try:
+    from .layout import LineTable, TableLine, iter_layouts, load_cached, page_lines, save_cached
+    from .metrics import METRICS
+except ImportError:  # run as a script
+    from layout import LineTable, TableLine, iter_layouts, load_cached, page_lines, save_cached
+    from metrics import METRICS
+
+Line = TableLine
+
+
+def visual_order(lines: List[Line]) -> List[Line]:
+    # Sort visual order within the page: y desc (top first), x asc
+    return sorted(lines, key=lambda l: (-l.y1, l.x0))
+
+
+def ordered_table_lines(table: LineTable) -> Iterator[Line]:
+    """Lines of a laid-out PDF in visual order, page by page."""
+    for _, _, lines in table.pages():
+        METRICS.count("pages")
+        yield from visual_order(lines)
+
+
+def iter_ordered_lines(pdf_path: str, layout_cache: Optional[str] = None) -> Iterator[Line]:
+    """Lines in visual order, laid out and sorted one page at a time.
+
+    Without layout_cache nothing outlives its page. With it, the compact line
+    table is built along the way and saved once the PDF has been read to the end.
+    """
+    table = load_cached(pdf_path, layout_cache)
+    if table is not None:
+        yield from ordered_table_lines(table)
+        return
+    table = LineTable() if layout_cache else None
+    for page_idx, layout in iter_layouts(pdf_path):
+        METRICS.count("pages")
+        yield from visual_order(page_lines(page_idx, layout) if table is None else table.add_page(page_idx, layout))
+    if table is not None:
+        save_cached(table, pdf_path, layout_cache)
+
+
+def collect_ordered_lines(pdf_path: str, layout_cache: Optional[str] = None) -> List[Line]:
+    # Visual order: page asc, y desc (top first), x asc
+    return list(iter_ordered_lines(pdf_path, layout_cache))
 
 
 BULLET_RE = re.compile(r"^(?:[-\u2022\u2219•◦·]|\d{1,3}[.)]|\(?\d{1,3}\)?[.)]?|[a-zA-Z][.)])\s+")
 HEADER_RE = re.compile(r"^(?:page\s*\d+|\d{4}|section|part|final|midterm|exam)\b", re.I)
 
 
-def extract_questions(lines: List[Line]) -> List[str]:
-    items: List[str] = []
+def iter_questions(lines: Iterable[Line]) -> Iterator[str]:
+    """Yield items as soon as they are finalized (first occurrence only)."""
     buf: List[str] = []
+    seen = set()
     last_y = None
     last_size = None
 
-    def flush():
+    def flush() -> Optional[str]:
         nonlocal buf
+        item = None
         if buf:
             s = " ".join(x.strip() for x in buf).strip()
             s = re.sub(r"\s+", " ", s)
-            if s:
-                items.append(s)
+            # Deduplicate while preserving order (in case of repeated headings)
+            if s and s not in seen:
+                seen.add(s)
+                item = s
         buf = []
+        return item
 
     for ln in lines:
         text = ln.text
@@ -97,11 +103,15 @@ def extract_questions(lines: List[Line]) -> List[str]:
         if last_y is not None and last_size is not None:
             gap = (last_y - ln.y1)
             if gap > max(20.0, 2.2 * last_size):
-                flush()
+                item = flush()
+                if item:
+                    yield item
 
         # New bullet/numbering => new item
         if BULLET_RE.match(text):
-            flush()
+            item = flush()
+            if item:
+                yield item
             # Strip bullet prefix for cleanliness
             text = BULLET_RE.sub("", text)
 
@@ -109,35 +119,81 @@ def extract_questions(lines: List[Line]) -> List[str]:
 
         # End when a line clearly ends with a question mark
         if text.rstrip().endswith("?"):
-            flush()
+            item = flush()
+            if item:
+                yield item
 
         last_y = ln.y1
         last_size = ln.avg_size if ln.avg_size else last_size
 
-    flush()
-    # Deduplicate while preserving order (in case of repeated headings)
-    seen = set()
-    unique_items = []
-    for s in items:
-        if s not in seen:
-            seen.add(s)
-            unique_items.append(s)
-    return unique_items
+    item = flush()
+    if item:
+        yield item
+
+
+def extract_questions(lines: List[Line]) -> List[str]:
+    return list(iter_questions(lines))
+
+
+def iter_questions_from_pdf(pdf_path: str, layout_cache: Optional[str] = None) -> Iterator[str]:
+    """Streaming extraction: pdfminer memory is bounded by the largest page, not the PDF."""
+    return iter_questions(iter_ordered_lines(pdf_path, layout_cache))
+
+
+def extract_questions_from_pdf(pdf_path: str, layout_cache: Optional[str] = None) -> List[str]:
+    return list(iter_questions_from_pdf(pdf_path, layout_cache))
+
+
+def extract_questions_from_table(table: LineTable) -> List[str]:
+    """Items of a PDF that is already laid out (see tools/layout.py build_tables())."""
+    return list(iter_questions(ordered_table_lines(table)))
 
 
 def main():
     ap = argparse.ArgumentParser(description="Extract exam questions/topics from a PDF into a text list")
     ap.add_argument("--pdf", required=True, help="Path to exam PDF")
     ap.add_argument("--out", required=True, help="Output .txt path (one item per line)")
+    ap.add_argument(
+        "--format",
+        choices=["txt", "cols"],
+        default="txt",
+        help="'cols' writes a columnar table directory instead of text (see tools/columnar.py; requires numpy)",
+    )
+    ap.add_argument(
+        "--layout-cache",
+        help="Directory of saved line tables (shared with extract_slide_titles.py); PDFs found there skip pdfminer",
+    )
+    ap.add_argument("--metrics", help="Write stage timings, pages/sec and item counts as JSON")
+    ap.add_argument("--profile", help="Directory for per-stage cProfile dumps (<tool>.<stage>.prof)")
     args = ap.parse_args()
+    METRICS.configure("extract_exam_questions", args.metrics, args.profile)
 
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    lines = collect_ordered_lines(args.pdf)
-    items = extract_questions(lines)
-    with open(args.out, "w", encoding="utf-8") as f:
-        for s in items:
-            f.write(s + "\n")
-    print(f"Wrote exam items: {args.out}  (count={len(items)})")
+    count = 0
+    if args.format == "cols":
+        try:
+            from .columnar import check_target, write_exam
+        except ImportError:
+            from columnar import check_target, write_exam
+        try:
+            check_target(args.out)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(2)
+        with METRICS.stage("extract"):
+            items = extract_questions_from_pdf(args.pdf, args.layout_cache)
+            write_exam(args.out, items)
+        count = len(items)
+    else:
+        with METRICS.stage("extract"), open(args.out, "w", encoding="utf-8") as f:
+            # Items are written as soon as they are finalized
+            for s in iter_questions_from_pdf(args.pdf, args.layout_cache):
+                f.write(s + "\n")
+                count += 1
+    print(f"Wrote exam items: {args.out}  (count={count})")
+    METRICS.count("items", count)
+    METRICS.rate("pages_per_sec", METRICS.counters.get("pages", 0), "extract")
+    METRICS.write(args.metrics)
 
 
 if __name__ == "__main__":
@@ -7,124 +7,320 @@ Output format: one line per page as `page|title` (1-based page index).
 
 Usage:
   python3 tools/extract_slide_titles.py --pdf "KDDM - data - 2.pdf" --out data/slides_topics.txt
+  python3 tools/extract_slide_titles.py --pdf slides/ --out data/ --workers 4
+  python3 tools/extract_slide_titles.py --pdf slides/ --compare-fast   # --fast accuracy/speed per deck
 
 Notes:
   - Requires: pdfminer.six
   - Heuristic: Pick the largest-font line in the top X% of each page.
   - Merges an immediately-adjacent second line if it shares similar font size.
+  - Pages are read through the shared line table (tools/layout.py); with
+    --layout-cache a PDF laid out before skips pdfminer.
 """
 import argparse
+import math
 import os
-from dataclasses import dataclass
-from statistics import mean
-from typing import Iterable, List, Optional, Tuple
-
-from pdfminer.high_level import extract_pages
-from pdfminer.layout import LTChar, LTTextBox, LTTextContainer, LTTextLine, LTTextLineHorizontal
-
-
-@dataclass
-class LineInfo:
-    page: int
-    text: str
-    x0: float
-    y0: float
-    x1: float
-    y1: float
-    avg_size: float
-
-
-def iter_lines_from_layout(layout) -> Iterable[LTTextLine]:
-    for element in layout:
-        if isinstance(element, LTTextBox):
-            for line in element:
-                if isinstance(line, (LTTextLine, LTTextLineHorizontal)):
-                    yield line
-        elif isinstance(element, LTTextContainer):
-            for line in element:
-                if isinstance(line, (LTTextLine, LTTextLineHorizontal)):
-                    yield line
-
-
-def line_avg_font_size(line: LTTextLine) -> Optional[float]:
-    sizes: List[float] = []
-    for obj in getattr(line, "_objs", []):
-        if isinstance(obj, LTChar):
-            sizes.append(obj.size)
-    if not sizes:
-        return None
-    return float(mean(sizes))
-
-
-def extract_titles(pdf_path: str, top_ratio: float = 0.35, merge_threshold: float = 0.9) -> List[Tuple[int, str]]:
-    results: List[Tuple[int, str]] = []
-    for page_idx, layout in enumerate(extract_pages(pdf_path), start=1):
-        page_height = getattr(layout, "height", None)
-        if not page_height:
-            page_height = 842.0  # default A4 height as a fallback
-
-        # Collect all lines with coordinates and avg font size
-        lines: List[LineInfo] = []
-        for line in iter_lines_from_layout(layout):
-            text = line.get_text().strip()
-            if not text:
-                continue
-            avg_sz = line_avg_font_size(line)
-            if avg_sz is None:
+import sys
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from .layout import LineTable, TableLine, build_table, build_tables, page_lines
+    from .match_topics import chapter_slug
+    from .metrics import METRICS
+except ImportError:  # run as a script
+    from layout import LineTable, TableLine, build_table, build_tables, page_lines
+    from match_topics import chapter_slug
+    from metrics import METRICS
+
+
+def merge_candidate(
+    lines: List[TableLine],
+    order: List[int],
+    ys: List[float],
+    title: TableLine,
+    merge_threshold: float,
+    tie_key: Optional[Callable[[int], tuple]] = None,
+) -> Optional[TableLine]:
+    """The line to append to a two-line title, if any.
+
+    Lines starting below the title (y0 < title.y0) are tried by increasing
+    distance |y1 - title.y0|, ties in layout order (or by tie_key); the
+    first one with a similar font size that is vertically close and
+    left-aligned wins.
+    `order` indexes `lines` by (y1, layout index) and `ys` holds those y1
+    values, so the walk starts at bisect(title.y0) and moves outwards.
+    Lines with y1 below title.y0 - 1.6 * size are never close enough, which
+    ends the downward walk early.
+    """
+    t = title.y0
+    reach = title.avg_size * 1.6
+    right = bisect_left(ys, t)
+    left = right - 1
+    while left >= 0 or right < len(ys):
+        d_left = abs(ys[left] - t) if left >= 0 else math.inf
+        d_right = abs(ys[right] - t) if right < len(ys) else math.inf
+        d = min(d_left, d_right)
+        if d_left > reach:
+            left = -1  # everything further down is too far away as well
+            if d_right == math.inf:
+                break
+            d = d_right
+        group: List[int] = []
+        while left >= 0 and abs(ys[left] - t) == d:
+            group.append(order[left])
+            left -= 1
+        while right < len(ys) and abs(ys[right] - t) == d:
+            group.append(order[right])
+            right += 1
+        for i in sorted(group, key=tie_key):
+            ln = lines[i]
+            if ln.y0 >= t:
                 continue
-            x0, y0, x1, y1 = line.bbox
-            lines.append(LineInfo(page_idx, text, x0, y0, x1, y1, avg_sz))
-
-        if not lines:
-            results.append((page_idx, ""))
-            continue
-
-        # Consider only lines in the top area of the page
-        top_cut = page_height * (1 - top_ratio)
-        top_lines = [ln for ln in lines if ln.y1 >= top_cut]
-        if not top_lines:
-            # fallback: take globally largest font line on page
-            top_lines = lines
-
-        # Choose the line with the largest avg font size; break ties by higher y
-        top_lines.sort(key=lambda ln: (ln.avg_size, ln.y1), reverse=True)
-        title = top_lines[0]
-
-        # Try merging a second line directly below if font size similar (for 2-line titles)
-        # Heuristic: same textbox proximity approximated via y-distance and size similarity
-        candidates_below = [ln for ln in lines if (ln.y0 < title.y0 and abs(ln.avg_size - title.avg_size) / max(title.avg_size, 1e-6) >= 0)]
-        # Sort by vertical proximity (closest below first)
-        candidates_below.sort(key=lambda ln: abs(ln.y1 - title.y0))
-
-        merged_text = title.text
-        for ln in candidates_below:
             size_similarity = min(title.avg_size, ln.avg_size) / max(title.avg_size, ln.avg_size)
-            vertically_close = (title.y0 - ln.y1) <= (title.avg_size * 1.6)
+            vertically_close = (t - ln.y1) <= reach
             horizontally_aligned = abs(ln.x0 - title.x0) <= max(10.0, title.avg_size * 0.8)
             if size_similarity >= merge_threshold and vertically_close and horizontally_aligned:
-                merged_text = f"{merged_text} {ln.text}".strip()
-                break
+                return ln
+    return None
+
+
+def title_for_lines(
+    lines: List[TableLine], page_height: float, top_ratio: float = 0.35, merge_threshold: float = 0.9
+) -> str:
+    if not page_height:
+        page_height = 842.0  # default A4 height as a fallback
+
+    # Lines with coordinates and avg font size (lines without characters are ignored)
+    lines = [ln for ln in lines if ln.avg_size is not None]
+    if not lines:
+        return ""
+
+    # One y-sorted index over the page serves both the top-area cut and the merge lookup
+    order = sorted(range(len(lines)), key=lambda i: (lines[i].y1, i))
+    ys = [lines[i].y1 for i in order]
+
+    # Consider only lines in the top area of the page
+    top = order[bisect_left(ys, page_height * (1 - top_ratio)):]
+    tie_key = None
+    if not top:
+        # fallback: take globally largest font line on page; merge ties then
+        # also go to the larger font (then higher line), as they always have
+        top = order
+        tie_key = lambda i: (-lines[i].avg_size, -lines[i].y1, i)
+
+    # Choose the line with the largest avg font size; break ties by higher y, then layout order
+    title = lines[max(top, key=lambda i: (lines[i].avg_size, lines[i].y1, -i))]
+
+    # Try merging a second line directly below if font size similar (for 2-line titles)
+    below = merge_candidate(lines, order, ys, title, merge_threshold, tie_key)
+    if below is None:
+        return title.text
+    return f"{title.text} {below.text}".strip()
+
+
+def title_for_page(page_idx: int, layout, top_ratio: float = 0.35, merge_threshold: float = 0.9) -> str:
+    """Title of one pdfminer page layout."""
+    lines = page_lines(page_idx, layout)
+    return title_for_lines(lines, getattr(layout, "height", None) or 0.0, top_ratio, merge_threshold)
+
+
+def titles_from_table(table: LineTable, top_ratio: float = 0.35, merge_threshold: float = 0.9) -> List[Tuple[int, str]]:
+    start = time.perf_counter()
+    titles = [
+        (page_idx, title_for_lines(lines, height, top_ratio, merge_threshold))
+        for page_idx, height, lines in table.pages()
+    ]
+    METRICS.add_time("title_selection", time.perf_counter() - start)
+    return titles
+
 
-        results.append((page_idx, merged_text))
-    return results
+def line_tables(
+    pdf_paths: List[str],
+    workers: int = 1,
+    layout_cache: Optional[str] = None,
+    title_region: Optional[float] = None,
+) -> Dict[str, LineTable]:
+    """Lay out several PDFs (or load them from the layout cache) on one process pool; see build_tables()."""
+    tables = build_tables([(path, title_region) for path in pdf_paths], workers, layout_cache)
+    return {path: tables[(path, title_region)] for path in pdf_paths}
+
+
+def extract_titles(
+    pdf_path: str,
+    top_ratio: float = 0.35,
+    merge_threshold: float = 0.9,
+    workers: int = 1,
+    layout_cache: Optional[str] = None,
+    fast: bool = False,
+) -> List[Tuple[int, str]]:
+    """Titles per page; fast restricts layout analysis to the title region (see compare_fast())."""
+    table = line_tables([pdf_path], workers, layout_cache, top_ratio if fast else None)[pdf_path]
+    return titles_from_table(table, top_ratio, merge_threshold)
+
+
+def extract_titles_batch(
+    pdf_paths: List[str],
+    top_ratio: float = 0.35,
+    merge_threshold: float = 0.9,
+    workers: int = 1,
+    layout_cache: Optional[str] = None,
+    fast: bool = False,
+) -> Dict[str, List[Tuple[int, str]]]:
+    """Extract titles from several PDFs, laying out all of them on one process pool."""
+    tables = line_tables(pdf_paths, workers, layout_cache, top_ratio if fast else None)
+    return {path: titles_from_table(tables[path], top_ratio, merge_threshold) for path in pdf_paths}
+
+
+def compare_fast(pdf_paths: List[str], top_ratio: float = 0.35, merge_threshold: float = 0.9) -> None:
+    """Print, per PDF, how many --fast titles equal the full-layout titles, the layout times and the differences."""
+    print(f"{'pdf':<40} {'pages':>5} {'same':>5} {'accuracy':>8} {'full s':>8} {'fast s':>8} {'speedup':>7}")
+    total = same_total = 0
+    diffs: List[str] = []
+    for pdf in pdf_paths:
+        timings = []
+        runs = []
+        for region in (None, top_ratio):
+            start = time.perf_counter()
+            table = build_table(pdf, title_region=region)
+            timings.append(time.perf_counter() - start)
+            runs.append(titles_from_table(table, top_ratio, merge_threshold))
+        full, fast = runs
+        same = sum(a == b for a, b in zip(full, fast))
+        total += len(full)
+        same_total += same
+        diffs.extend(
+            f"  {os.path.basename(pdf)} p.{page}: {title!r} -> {fast_title!r}"
+            for (page, title), (_, fast_title) in zip(full, fast)
+            if title != fast_title
+        )
+        print(
+            f"{os.path.basename(pdf)[:40]:<40} {len(full):>5} {same:>5} {same / max(len(full), 1):>8.1%} "
+            f"{timings[0]:>8.2f} {timings[1]:>8.2f} {timings[0] / max(timings[1], 1e-9):>6.1f}x"
+        )
+    print(f"Overall: {same_total}/{total} titles identical ({same_total / max(total, 1):.1%})")
+    if diffs:
+        print("Differences (full -> fast):")
+        print("\n".join(diffs))
+
+
+def check_cols_targets(paths: List[str]) -> None:
+    """Exit before any layout work if a --format cols output would replace something that is not a table."""
+    try:
+        from .columnar import check_target
+    except ImportError:
+        from columnar import check_target
+    for path in paths:
+        try:
+            check_target(path)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(2)
+
+
+def write_titles(titles: List[Tuple[int, str]], path: str, fmt: str = "txt") -> None:
+    if fmt == "cols":
+        try:
+            from .columnar import write_slides
+        except ImportError:
+            from columnar import write_slides
+        write_slides(path, titles)
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for page, text in titles:
+            f.write(f"{page}|{text}\n")
+
+
+def record_metrics(pages: int, path: Optional[str]) -> None:
+    METRICS.count("pages", pages)
+    METRICS.rate("pages_per_sec", pages, "extract")
+    METRICS.write(path)
 
 
 def main():
     ap = argparse.ArgumentParser(description="Extract slide page titles from a PDF (font-size & top-of-page heuristic)")
-    ap.add_argument("--pdf", required=True, help="Path to slides PDF")
-    ap.add_argument("--out", required=True, help="Output .txt path (one 'page|title' per line)")
+    ap.add_argument("--pdf", required=True, help="Path to slides PDF, or a directory of chapter PDFs")
+    ap.add_argument(
+        "--out",
+        help="Output .txt path (one 'page|title' per line); with a --pdf directory, the output directory "
+        "for slides_topics__<chapter>.txt files",
+    )
+    ap.add_argument(
+        "--format",
+        choices=["txt", "cols"],
+        default="txt",
+        help="'cols' writes a columnar table directory instead of text (see tools/columnar.py; requires numpy)",
+    )
     ap.add_argument("--top-ratio", type=float, default=0.35, help="Top-of-page ratio to search for titles")
     ap.add_argument("--merge-threshold", type=float, default=0.9, help="Font size similarity threshold for merging (0-1)")
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes for page-range extraction")
+    ap.add_argument(
+        "--fast",
+        action="store_true",
+        help="Lay out only the title region of each page, without figures, images or box grouping",
+    )
+    ap.add_argument(
+        "--compare-fast",
+        action="store_true",
+        help="Report how many --fast titles match the full layout on --pdf (file or directory) and exit",
+    )
+    ap.add_argument(
+        "--layout-cache",
+        help="Directory of saved line tables (shared with extract_exam_questions.py); PDFs found there skip pdfminer",
+    )
+    ap.add_argument("--metrics", help="Write stage timings (layout vs title selection) and pages/sec as JSON")
+    ap.add_argument("--profile", help="Directory for per-stage cProfile dumps (<tool>.<stage>.prof)")
     args = ap.parse_args()
+    METRICS.configure("extract_slide_titles", args.metrics, args.profile)
 
-    os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    titles = extract_titles(args.pdf, top_ratio=args.top_ratio, merge_threshold=args.merge_threshold)
-    with open(args.out, "w", encoding="utf-8") as f:
-        for page, text in titles:
-            f.write(f"{page}|{text}\n")
+    if args.compare_fast:
+        pdfs = [args.pdf]
+        if os.path.isdir(args.pdf):
+            pdfs = sorted(os.path.join(args.pdf, n) for n in os.listdir(args.pdf) if n.lower().endswith(".pdf"))
+        compare_fast(pdfs, top_ratio=args.top_ratio, merge_threshold=args.merge_threshold)
+        return
+    if not args.out:
+        ap.error("--out is required")
+
+    if os.path.isdir(args.pdf):
+        pdfs = sorted(
+            os.path.join(args.pdf, name) for name in os.listdir(args.pdf) if name.lower().endswith(".pdf")
+        )
+        if args.format == "cols":
+            check_cols_targets([os.path.join(args.out, f"slides_topics__{chapter_slug(pdf)}.cols") for pdf in pdfs])
+        with METRICS.stage("extract"):
+            batch = extract_titles_batch(
+                pdfs,
+                top_ratio=args.top_ratio,
+                merge_threshold=args.merge_threshold,
+                workers=args.workers,
+                layout_cache=args.layout_cache,
+                fast=args.fast,
+            )
+        for pdf in pdfs:
+            out = os.path.join(args.out, f"slides_topics__{chapter_slug(pdf)}.{args.format}")
+            write_titles(batch[pdf], out, args.format)
+            print(f"Wrote slide titles: {out}  (pages={len(batch[pdf])})")
+        record_metrics(sum(len(t) for t in batch.values()), args.metrics)
+        return
+
+    if args.format == "cols":
+        check_cols_targets([args.out])
+    with METRICS.stage("extract"):
+        titles = extract_titles(
+            args.pdf,
+            top_ratio=args.top_ratio,
+            merge_threshold=args.merge_threshold,
+            workers=args.workers,
+            layout_cache=args.layout_cache,
+            fast=args.fast,
+        )
+    write_titles(titles, args.out, args.format)
     print(f"Wrote slide titles: {args.out}  (pages={len(titles)})")
+    record_metrics(len(titles), args.metrics)
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,369 @@
+"""
+Shared pdfminer layout pass for both extractors.
+
+A PDF is laid out once into a LineTable: per text line its page, bbox and
+average font size in flat `array` columns, and its (stripped) text as
+offsets into one string buffer, plus per-page heights. Title and question
+heuristics both read lines from the table, so pdfminer objects never
+outlive their page, and a saved table (see load_cached/save_cached) lets
+later runs skip pdfminer entirely.
+
+Table files (`<cache dir>/<sha256 of the PDF>.<layout version>.lines`) are
+one JSON header line followed by the raw column bytes and the UTF-8 text
+buffer. The layout version (layout_version()) hashes this module and the
+layout parameters, including pdfminer's version and LAParams defaults, so
+tables laid out differently are never reused.
+
+build_tables() lays out many PDFs at once: page ranges from all of them go
+to one process pool, largest (by bytes) first.
+
+Slide titles only need the top of each page. With a title region
+(iter_layouts(..., title_region=top_ratio)) form and image XObjects are not
+parsed and vector graphics are dropped, characters below the region (plus
+a margin for two-line titles) never reach layout analysis, and
+FAST_LAPARAMS turns off the hierarchical grouping of text boxes
+(boxes_flow=None), which the title heuristic does not use.
+"""
+import hashlib
+import json
+import math
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from statistics import mean
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LAParams, LTChar, LTTextBox, LTTextContainer, LTTextLine, LTTextLineHorizontal
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+try:
+    from .extract_cache import file_digest
+    from .metrics import METRICS, measured
+except ImportError:  # run as a script
+    from extract_cache import file_digest
+    from metrics import METRICS, measured
+
+FORMAT = "tools-layout/1"
+
+
+class TableLine(NamedTuple):
+    page: int
+    text: str
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    avg_size: Optional[float]  # None when the line has no LTChar
+
+
+def iter_text_lines(layout) -> Iterator[LTTextLine]:
+    for element in layout:
+        if isinstance(element, (LTTextBox, LTTextContainer)):
+            for line in element:
+                if isinstance(line, (LTTextLine, LTTextLineHorizontal)):
+                    yield line
+
+
+def line_avg_font_size(line: LTTextLine) -> Optional[float]:
+    sizes = [obj.size for obj in getattr(line, "_objs", []) if isinstance(obj, LTChar)]
+    if not sizes:
+        return None
+    return float(mean(sizes))
+
+
+def page_lines(page_idx: int, layout) -> List[TableLine]:
+    """The non-empty text lines of one pdfminer page layout, in layout order."""
+    out: List[TableLine] = []
+    for line in iter_text_lines(layout):
+        text = line.get_text().strip()
+        if text:
+            out.append(TableLine(page_idx, text, *line.bbox, line_avg_font_size(line)))
+    return out
+
+
+class LineTable:
+    # column name -> array typecode; per-line columns, then per-page columns
+    LINE_COLUMNS = {"page": "i", "x0": "d", "y0": "d", "x1": "d", "y1": "d", "size": "d", "offset": "q"}
+    PAGE_COLUMNS = {"page_number": "i", "page_height": "d", "page_start": "q"}
+
+    def __init__(self):
+        for name, code in {**self.LINE_COLUMNS, **self.PAGE_COLUMNS}.items():
+            setattr(self, name, array(code))
+        self.offset.append(0)  # offsets has one more entry than there are lines
+        self.chunks: List[str] = []
+        self._text: Optional[str] = ""
+
+    def __len__(self) -> int:
+        return len(self.page)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(self.chunks)
+            self.chunks = [self._text]
+        return self._text
+
+    def add_page(self, page_idx: int, layout) -> List[TableLine]:
+        """Append one laid-out page; returns its lines so streaming callers need not read them back."""
+        self.page_number.append(page_idx)
+        self.page_height.append(getattr(layout, "height", None) or 0.0)
+        self.page_start.append(len(self))
+        out = page_lines(page_idx, layout)
+        for line in out:
+            self.page.append(page_idx)
+            for name in ("x0", "y0", "x1", "y1"):
+                getattr(self, name).append(getattr(line, name))
+            self.size.append(math.nan if line.avg_size is None else line.avg_size)
+            self.chunks.append(line.text)
+            self.offset.append(self.offset[-1] + len(line.text))
+            self._text = None
+        return out
+
+    def extend(self, other: "LineTable") -> None:
+        """Append another table's pages (e.g. a later page range of the same PDF)."""
+        base_lines, base_text = len(self), self.offset[-1]
+        for name in self.LINE_COLUMNS:
+            if name != "offset":
+                getattr(self, name).extend(getattr(other, name))
+        self.offset.extend(base_text + o for o in other.offset[1:])
+        self.page_number.extend(other.page_number)
+        self.page_height.extend(other.page_height)
+        self.page_start.extend(base_lines + s for s in other.page_start)
+        self.chunks.append(other.text)
+        self._text = None
+
+    def line(self, i: int) -> TableLine:
+        size = self.size[i]
+        return TableLine(
+            self.page[i],
+            self.text[self.offset[i]:self.offset[i + 1]],
+            self.x0[i],
+            self.y0[i],
+            self.x1[i],
+            self.y1[i],
+            None if math.isnan(size) else size,
+        )
+
+    def pages(self) -> Iterator[Tuple[int, float, List[TableLine]]]:
+        """(page number, page height or 0.0, lines in layout order) per page."""
+        ends = list(self.page_start[1:]) + [len(self)]
+        for k, page_idx in enumerate(self.page_number):
+            yield page_idx, self.page_height[k], [self.line(i) for i in range(self.page_start[k], ends[k])]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        columns = {**self.LINE_COLUMNS, **self.PAGE_COLUMNS}
+        text = self.text.encode("utf-8")
+        header = {
+            "format": FORMAT,
+            "byteorder": sys.byteorder,
+            "columns": [[name, code, len(getattr(self, name))] for name, code in columns.items()],
+            "text_bytes": len(text),
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for name in columns:
+                getattr(self, name).tofile(f)
+            f.write(text)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LineTable":
+        table = cls()
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != FORMAT:
+                raise ValueError(f"{path}: not a {FORMAT} file")
+            for name, code, n in header["columns"]:
+                col = array(code)
+                col.fromfile(f, n)
+                if header["byteorder"] != sys.byteorder:
+                    col.byteswap()
+                setattr(table, name, col)
+            table._text = f.read(header["text_bytes"]).decode("utf-8")
+        table.chunks = [table._text]
+        return table
+
+
+FAST_LAPARAMS = dict(boxes_flow=None, detect_vertical=False, all_texts=False)
+# Below the title region, keep this fraction of the page height for a title's second line
+TITLE_MARGIN = 0.12
+
+
+class TitleRegionAggregator(PDFPageAggregator):
+    """Page aggregator that only lays out text in the top `top_ratio` of each page."""
+
+    def __init__(self, rsrcmgr: PDFResourceManager, laparams: LAParams, top_ratio: float):
+        super().__init__(rsrcmgr, laparams=laparams)
+        self.top_ratio = top_ratio
+
+    def paint_path(self, gstate, stroke, fill, evenodd, path) -> None:
+        pass
+
+    def end_page(self, page) -> None:
+        cut = self.cur_item.height * (1 - self.top_ratio - TITLE_MARGIN)
+        kept = [obj for obj in self.cur_item._objs if obj.y1 >= cut]
+        if kept:  # an empty region keeps the whole page for the largest-font fallback
+            self.cur_item._objs = kept
+        super().end_page(page)
+
+
+class TitleRegionInterpreter(PDFPageInterpreter):
+    def do_Do(self, xobjid) -> None:
+        # Form and image XObjects become figures, whose text is never laid out
+        # (all_texts=False); skip parsing their content streams altogether.
+        pass
+
+
+def iter_region_pages(pdf_path: str, page_numbers: Optional[Iterable[int]], top_ratio: float):
+    """Like pdfminer's extract_pages(), restricted to the title region and with FAST_LAPARAMS."""
+    with open(pdf_path, "rb") as fp:
+        rsrcmgr = PDFResourceManager(caching=True)
+        device = TitleRegionAggregator(rsrcmgr, LAParams(**FAST_LAPARAMS), top_ratio)
+        interpreter = TitleRegionInterpreter(rsrcmgr, device)
+        for page in PDFPage.get_pages(fp, page_numbers, caching=True):
+            interpreter.process_page(page)
+            yield device.get_result()
+
+
+def iter_layouts(
+    pdf_path: str,
+    page_numbers: Optional[Iterable[int]] = None,
+    first_page: int = 1,
+    title_region: Optional[float] = None,
+):
+    """(1-based page number, pdfminer layout) pairs; layout time is reported as stage "layout".
+
+    title_region: lay out only the top fraction of each page (fast path for slide titles).
+    """
+    if title_region is None:
+        layouts = extract_pages(pdf_path, page_numbers=page_numbers)
+    else:
+        layouts = iter_region_pages(pdf_path, page_numbers, title_region)
+    return enumerate(METRICS.timed(layouts, "layout"), start=first_page)
+
+
+def build_table(
+    pdf_path: str, first: Optional[int] = None, last: Optional[int] = None, title_region: Optional[float] = None
+) -> LineTable:
+    """Lay out the whole PDF, or 1-based pages first..last (inclusive)."""
+    table = LineTable()
+    pages = None if first is None else range(first - 1, last)
+    for page_idx, layout in iter_layouts(pdf_path, pages, first or 1, title_region):
+        table.add_page(page_idx, layout)
+    return table
+
+
+@lru_cache(maxsize=None)
+def layout_version() -> str:
+    """Hash of everything besides the PDF that shapes a table: this module and the layout parameters."""
+    import pdfminer
+
+    h = hashlib.sha256()
+    with open(__file__, "rb") as f:
+        h.update(f.read())
+    params = (FORMAT, sorted(FAST_LAPARAMS.items()), TITLE_MARGIN, sorted(vars(LAParams()).items()), pdfminer.__version__)
+    h.update(repr(params).encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def cache_path(pdf_path: str, cache_dir: str, title_region: Optional[float] = None) -> str:
+    variant = "" if title_region is None else f".top{title_region:g}"
+    return os.path.join(cache_dir, f"{file_digest(pdf_path)}.{layout_version()}{variant}.lines")
+
+
+def load_cached(pdf_path: str, cache_dir: Optional[str], title_region: Optional[float] = None) -> Optional[LineTable]:
+    """The saved table of a PDF; a title-region table is only reused for the same region."""
+    if not cache_dir:
+        return None
+    path = cache_path(pdf_path, cache_dir, title_region)
+    if not os.path.exists(path):
+        return None
+    METRICS.count("layout_cache_hits")
+    return LineTable.load(path)
+
+
+def discard_cached(pdf_path: str, cache_dir: Optional[str], title_region: Optional[float] = None) -> None:
+    """Remove the saved table of a PDF, so the next load_cached() misses (e.g. for --rebuild)."""
+    if not cache_dir:
+        return
+    try:
+        os.remove(cache_path(pdf_path, cache_dir, title_region))
+    except FileNotFoundError:
+        pass
+
+
+def save_cached(
+    table: LineTable, pdf_path: str, cache_dir: Optional[str], title_region: Optional[float] = None
+) -> None:
+    if cache_dir:
+        table.save(cache_path(pdf_path, cache_dir, title_region))
+
+
+def count_pages(pdf_path: str) -> int:
+    with open(pdf_path, "rb") as f:
+        return sum(1 for _ in PDFPage.get_pages(f))
+
+
+Job = Tuple[str, Optional[float]]  # (PDF path, title_region)
+
+
+def schedule_ranges(jobs: List[Job], workers: int) -> List[Tuple[Job, int, int]]:
+    """(job, first, last) page ranges of all jobs, most expensive first.
+
+    Ranges are sized on the total page count, a few per worker, so small
+    decks become one task and large ones several. A range's cost is
+    estimated from its share of the PDF's bytes: pages of image-heavy
+    decks take longer to lay out.
+    """
+    pages = {job: count_pages(job[0]) for job in jobs}
+    size = max(1, -(-sum(pages.values()) // (workers * 4)))
+    ranges = []
+    for job, n_pages in pages.items():
+        bytes_per_page = os.path.getsize(job[0]) / max(n_pages, 1)
+        for first in range(1, n_pages + 1, size):
+            last = min(first + size - 1, n_pages)
+            ranges.append(((last - first + 1) * bytes_per_page, job, first, last))
+    ranges.sort(key=lambda r: -r[0])  # stable: ties keep document and page order
+    return [(job, first, last) for _, job, first, last in ranges]
+
+
+def build_tables(jobs: List[Job], workers: int = 1, layout_cache: Optional[str] = None) -> Dict[Job, LineTable]:
+    """Lay out several PDFs, each whole or only its title region, or load them from layout_cache.
+
+    With workers > 1, page ranges from all PDFs share one process pool and
+    are submitted biggest first (schedule_ranges()); whichever worker is
+    free takes the next range, so one large deck does not leave the others
+    waiting. Each PDF's table is reassembled in page order.
+    """
+    tables: Dict[Job, LineTable] = {}
+    for job in dict.fromkeys(jobs):
+        cached = load_cached(job[0], layout_cache, job[1])
+        if cached is not None:
+            tables[job] = cached
+    pending = [job for job in dict.fromkeys(jobs) if job not in tables]
+    if workers <= 1:
+        for path, region in pending:
+            tables[(path, region)] = build_table(path, title_region=region)
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                (job, first): pool.submit(measured, METRICS.settings(), "layout", build_table, job[0], first, last, job[1])
+                for job, first, last in schedule_ranges(pending, workers)
+            }
+            order = {job: k for k, job in enumerate(pending)}
+            for job in pending:
+                tables[job] = LineTable()
+            for job, first in sorted(futures, key=lambda key: (order[key[0]], key[1])):
+                table, delta = futures[(job, first)].result()
+                tables[job].extend(table)
+                METRICS.merge_worker(delta)
+    for path, region in pending:
+        save_cached(tables[(path, region)], path, layout_cache, region)
+    return tables
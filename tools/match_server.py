@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Local match service: "which slides cover this question?" from a warm index.
+
+All chapters are loaded and normalized once; the candidate index over the
+unique normalized slide titles stays in memory and is rebuilt in the
+background when the slides files or the aliases file change (new files
+matching --slides are picked up too). Each query is one exam question,
+scored against the slide titles with the same combined_score() as
+match_topics.py.
+
+Usage:
+  python3 tools/match_server.py --slides 'data/slides_topics__*.txt' --aliases data/aliases.json
+  curl 'http://127.0.0.1:8765/match?q=Explain+DBSCAN&k=5'
+
+  # or over a Unix socket
+  python3 tools/match_server.py --slides 'data/slides_topics__*.txt' --socket /tmp/match.sock
+  curl --unix-socket /tmp/match.sock 'http://localhost/match?q=Explain+DBSCAN'
+
+Endpoints:
+  GET  /match?q=TEXT[&k=5][&min_score=0.5]   top-k slide titles for the question
+  POST /match  {"q": TEXT, "k": 5, "min_score": 0.5}
+  GET  /health                               loaded files, counts, reloads, queries
+"""
+import argparse
+import heapq
+import json
+import os
+import signal
+import socketserver
+import stat
+import sys
+import threading
+import time
+from difflib import SequenceMatcher
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+if __package__ in (None, ""):
+    # Run as a script: make the `tools` package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.match_topics import (
+    AliasNormalizer,
+    CandidateIndex,
+    chapter_source,
+    combined_score,
+    confidence,
+    expand_inputs,
+    group_topics,
+    load_aliases,
+    load_lines,
+    parse_slides,
+)
+
+Signature = Tuple[Tuple[str, int, int], ...]
+
+
+def file_signature(paths: List[str]) -> Signature:
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        sig.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+class SlideIndex:
+    """Immutable snapshot of the slides: unique normalized titles, their slides and a CandidateIndex."""
+
+    def __init__(self, patterns: List[str], aliases_path: Optional[str]):
+        self.paths = expand_inputs(patterns)
+        self.signature = file_signature(self.paths + ([aliases_path] if aliases_path else []))
+        self.normalizer = AliasNormalizer(load_aliases(aliases_path))
+        self.slides: List[Tuple[str, Optional[int], str]] = [
+            (chapter_source(path), page, topic) for path in self.paths for page, topic in parse_slides(load_lines(path))
+        ]
+        self.topics, topic_ids = group_topics([self.normalizer(topic) for _, _, topic in self.slides])
+        self.occurrences: List[List[int]] = [[] for _ in self.topics]
+        for i, u in enumerate(topic_ids):
+            self.occurrences[u].append(i)
+        self.index = CandidateIndex(self.topics)
+        self.loaded_at = time.time()
+
+    def query(self, question: str, k: int, min_score: float) -> List[Dict]:
+        q = self.normalizer.normalize(question)
+        # Per query, not the shared cached matchers of match_topics.py: queries run on concurrent threads
+        matcher = SequenceMatcher(None, "", q)
+        scored: List[Tuple[float, int]] = []
+        for u in self.index.candidates(q, min_score):
+            # Same orientation as match_topics.py: topic first, question second
+            s = combined_score(self.topics[u], q, min_score, matcher)
+            if s >= min_score:
+                scored.append((s, u))
+        out = []
+        for s, u in heapq.nlargest(k, scored, key=itemgetter(0)):
+            slides = [self.slides[i] for i in self.occurrences[u]]
+            out.append(
+                {
+                    "slide_topic": slides[0][2],
+                    "score": round(s, 3),
+                    "confidence": confidence(s),
+                    "slides": [{"source": source, "page": page} for source, page, _ in slides],
+                }
+            )
+        return out
+
+
+class MatchService:
+    def __init__(self, patterns: List[str], aliases_path: Optional[str], k: int, min_score: float):
+        self.patterns = patterns
+        self.aliases_path = aliases_path
+        self.k = k
+        self.min_score = min_score
+        self.index = SlideIndex(patterns, aliases_path)
+        self.reloads = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.stats_lock = threading.Lock()
+
+    def match(self, question: str, k: Optional[int] = None, min_score: Optional[float] = None) -> Dict:
+        index = self.index  # one snapshot per query, even if a reload swaps it meanwhile
+        start = time.perf_counter()
+        results = index.query(question, k or self.k, self.min_score if min_score is None else min_score)
+        elapsed = time.perf_counter() - start
+        with self.stats_lock:
+            self.queries += 1
+            self.query_seconds += elapsed
+        return {"query": question, "results": results, "elapsed_ms": round(elapsed * 1000, 3)}
+
+    def health(self) -> Dict:
+        index = self.index
+        return {
+            "files": index.paths,
+            "slides": len(index.slides),
+            "unique_topics": len(index.topics),
+            "loaded_at": index.loaded_at,
+            "reloads": self.reloads,
+            "queries": self.queries,
+            "mean_query_ms": round(1000 * self.query_seconds / self.queries, 3) if self.queries else None,
+        }
+
+    def changed(self) -> bool:
+        paths = expand_inputs(self.patterns) + ([self.aliases_path] if self.aliases_path else [])
+        return file_signature(paths) != self.index.signature
+
+    def watch(self, interval: float) -> None:
+        """Poll the inputs and swap in a rebuilt index when they change (run in a daemon thread)."""
+        while True:
+            time.sleep(interval)
+            try:
+                if not self.changed():
+                    continue
+                index = SlideIndex(self.patterns, self.aliases_path)
+            except Exception as exc:  # e.g. a file caught mid-write; retry on the next poll
+                print(f"Reload failed, keeping the current index: {exc}", file=sys.stderr)
+                continue
+            self.index = index
+            self.reloads += 1
+            print(f"Reloaded {len(index.paths)} files ({len(index.slides)} slides)", file=sys.stderr)
+
+
+def parse_param(params: Dict, name: str, kind: type):
+    """params[name] as kind (from a query string or JSON), None if absent; TypeError/ValueError if invalid."""
+    value = params.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise TypeError(f"{name}: {value!r}")
+    if kind is int and isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{name}: {value!r}")
+    return kind(value)
+
+
+class Handler(BaseHTTPRequestHandler):
+    service: MatchService
+    verbose = False
+
+    def send_json(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def answer(self, params: Dict) -> None:
+        question = params.get("q")
+        if question is None or question == "":
+            self.send_json(400, {"error": "missing query parameter 'q'"})
+            return
+        if not isinstance(question, str):
+            self.send_json(400, {"error": "'q' must be a string"})
+            return
+        try:
+            k = parse_param(params, "k", int)
+            min_score = parse_param(params, "min_score", float)
+            if k is not None and k < 1:
+                raise ValueError(f"k: {k}")
+        except (TypeError, ValueError):
+            self.send_json(400, {"error": "'k' must be a positive integer and 'min_score' a number"})
+            return
+        try:
+            result = self.service.match(question, k, min_score)
+        except Exception as exc:  # answer with JSON rather than dropping the connection
+            print(f"Query failed: {question!r}: {exc!r}", file=sys.stderr)
+            self.send_json(500, {"error": "internal error"})
+            return
+        self.send_json(200, result)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self.send_json(200, self.service.health())
+        elif url.path == "/match":
+            self.answer({name: values[0] for name, values in parse_qs(url.query).items()})
+        else:
+            self.send_json(404, {"error": f"unknown path {url.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/match":
+            self.send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            params = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError:
+            self.send_json(400, {"error": "body must be JSON"})
+            return
+        if not isinstance(params, dict):
+            self.send_json(400, {"error": "body must be a JSON object"})
+            return
+        self.answer(params)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+class HTTPServer(ThreadingHTTPServer):
+    request_queue_size = 128  # bursts of concurrent clients, e.g. a CI job
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def is_socket(path: str) -> bool:
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve slide lookups for exam questions from a warm in-memory index")
+    ap.add_argument("--slides", nargs="+", default=["data/slides_topics__*.txt"], help="Slides topics files or globs")
+    ap.add_argument("--aliases", help="Optional JSON mapping canonical->list of synonyms")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--socket", help="Listen on this Unix socket path instead of --host/--port")
+    ap.add_argument("--k", type=int, default=5, help="Default number of slide titles per query")
+    ap.add_argument("--min-score", type=float, default=0.5, help="Default minimum combined score")
+    ap.add_argument("--poll", type=float, default=2.0, help="Seconds between checks for changed input files (0: off)")
+    ap.add_argument("--verbose", action="store_true", help="Log every request")
+    args = ap.parse_args()
+    if args.socket and os.path.lexists(args.socket) and not is_socket(args.socket):
+        # A stale socket from an earlier run is replaced below; anything else is left alone
+        print(f"ERROR: --socket {args.socket} exists and is not a socket.")
+        sys.exit(2)
+
+    service = MatchService(args.slides, args.aliases, args.k, args.min_score)
+    if not service.index.paths:
+        print(f"ERROR: no slides files match: {' '.join(args.slides)}")
+        sys.exit(2)
+    Handler.service = service
+    Handler.verbose = args.verbose
+    if args.poll > 0:
+        threading.Thread(target=service.watch, args=(args.poll,), daemon=True).start()
+
+    if args.socket:
+        if is_socket(args.socket):
+            os.unlink(args.socket)
+        server = UnixHTTPServer(args.socket, Handler)
+        where = args.socket
+    else:
+        server = HTTPServer((args.host, args.port), Handler)
+        where = f"http://{args.host}:{server.server_address[1]}"
+    health = service.health()
+    print(f"Serving {health['slides']} slides ({health['unique_topics']} unique titles) on {where}")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # clean up the socket on kill, too
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and is_socket(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
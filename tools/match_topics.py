@@ -1,11 +1,27 @@
 #!/usr/bin/env python3
+# Startup matters for one-off lookups: csv, difflib, glob, json and the
+# process pool are imported in the functions that use them, and normalized
+# texts come from a snapshot (see load_normalizer()).
 import argparse
-import csv
-import json
+import heapq
+import importlib
+import marshal
 import os
 import re
-from difflib import SequenceMatcher
-from typing import Dict, List, Optional, Tuple
+import sys
+import time
+import zlib
+from functools import lru_cache
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from difflib import SequenceMatcher
+
+try:
+    from .metrics import METRICS, measured
+except ImportError:  # run as a script
+    from metrics import METRICS, measured
 
 
 def load_lines(path: str) -> List[str]:
@@ -37,6 +53,8 @@ def load_aliases(path: Optional[str]) -> Dict[str, List[str]]:
     }
     if not path:
         return default_aliases
+    import json
+
     try:
         with open(path, "r", encoding="utf-8") as f:
             user_aliases = json.load(f)
@@ -55,20 +73,147 @@ STOPWORDS = set(
 )
 
 
-def normalize(text: str, aliases: Dict[str, List[str]]) -> str:
-    t = text.lower().strip()
-    # apply aliases (replace synonyms with canonical form)
-    # longer keys first to avoid partial overwrites
-    for canon in sorted(aliases.keys(), key=len, reverse=True):
-        for syn in aliases[canon]:
-            t = re.sub(rf"\b{re.escape(syn)}\b", canon, t)
-    # remove punctuation
-    t = _punct_re.sub(" ", t)
-    # collapse whitespace
-    t = _ws_re.sub(" ", t).strip()
-    # remove trivial stopwords at ends
-    tokens = [w for w in t.split() if w not in STOPWORDS]
-    return " ".join(tokens)
+class AliasNormalizer:
+    """Normalizer built once from an alias dict, memoizing normalized strings.
+
+    Rules keep the original semantics: canonical keys longest first, each
+    synonym replaced on word boundaries in order. A replacement can create
+    text matched by a later synonym ("k means clustering" -> "k-means
+    clustering" -> "k-means"), so the rules still run in sequence; a single
+    compiled alternation over all synonyms decides in one scan whether a text
+    needs any rewriting at all, and later rules are skipped unless their
+    synonym occurs as a substring. The patterns are compiled on the first
+    cache miss, so a run served from a snapshot never compiles them.
+    """
+
+    def __init__(self, aliases: Dict[str, List[str]]):
+        self.aliases = aliases
+        self.rules: Optional[List[Tuple[str, "re.Pattern[str]", str]]] = None
+        self.any_alias: Optional["re.Pattern[str]"] = None
+        self.cache: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.substitutions = 0
+        self.loaded = 0  # entries seeded from a snapshot (see load_normalizer())
+
+    def compile(self) -> None:
+        rules = []
+        for canon in sorted(self.aliases.keys(), key=len, reverse=True):
+            for syn in self.aliases[canon]:
+                rules.append((syn, re.compile(rf"\b{re.escape(syn)}\b"), canon))
+        syns = sorted({syn for syn, _, _ in rules}, key=len, reverse=True)
+        self.any_alias = re.compile(r"\b(?:" + "|".join(re.escape(x) for x in syns) + r")\b") if syns else None
+        self.rules = rules  # last: apply_aliases() in another thread may already see it
+
+    def apply_aliases(self, t: str) -> str:
+        if self.rules is None:
+            self.compile()
+        if self.any_alias is None or not self.any_alias.search(t):
+            return t
+        for syn, pattern, canon in self.rules:
+            if syn in t:
+                t, n = pattern.subn(canon, t)
+                self.substitutions += n
+        return t
+
+    def __call__(self, text: str) -> str:
+        cached = self.cache.get(text)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        out = self.cache[text] = self.normalize(text)
+        return out
+
+    def normalize(self, text: str) -> str:
+        """Uncached normalization, for one-off texts such as server queries."""
+        t = self.apply_aliases(text.lower().strip())
+        # remove punctuation
+        t = _punct_re.sub(" ", t)
+        # collapse whitespace
+        t = _ws_re.sub(" ", t).strip()
+        # remove trivial stopwords at ends
+        return " ".join(w for w in t.split() if w not in STOPWORDS)
+
+
+_normalizers: Dict[Tuple, AliasNormalizer] = {}
+
+
+def get_normalizer(aliases) -> AliasNormalizer:
+    if isinstance(aliases, AliasNormalizer):
+        return aliases
+    key = tuple((k, tuple(v)) for k, v in aliases.items())
+    norm = _normalizers.get(key)
+    if norm is None:
+        norm = _normalizers[key] = AliasNormalizer(aliases)
+    return norm
+
+
+SNAPSHOT_FORMAT = "tools-normalize/1"
+
+
+def snapshot_path(cache_dir: str, aliases: Dict[str, List[str]]) -> str:
+    key = zlib.crc32(repr(sorted(aliases.items())).encode("utf-8"))
+    return os.path.join(cache_dir, f"normalized-{key:08x}.marshal")
+
+
+def _code_version() -> int:
+    # Normalized texts are only valid for the normalization code that produced them
+    with open(__file__, "rb") as f:
+        return zlib.crc32(f.read())
+
+
+def load_normalizer(aliases: Dict[str, List[str]], cache_dir: Optional[str]) -> AliasNormalizer:
+    """get_normalizer(aliases), seeded from the snapshot in cache_dir if there is a valid one.
+
+    The snapshot is one marshal file holding the alias map and the texts the
+    last run normalized with it (see save_normalizer()); loading it is a single
+    read, and texts found there skip alias compilation and rewriting.
+    """
+    normalizer = get_normalizer(aliases)
+    if not cache_dir:
+        return normalizer
+    try:
+        with open(snapshot_path(cache_dir, aliases), "rb") as f:
+            snap = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return normalizer
+    items = [(k, list(v)) for k, v in aliases.items()]
+    if snap.get("format") == SNAPSHOT_FORMAT and snap.get("code") == _code_version() and snap.get("aliases") == items:
+        normalizer.cache.update(snap["normalized"])
+        normalizer.loaded = len(snap["normalized"])
+    return normalizer
+
+
+def save_normalizer(normalizer: AliasNormalizer, cache_dir: Optional[str], texts: Iterable[str]) -> None:
+    """Snapshot the normalized forms of this run's texts, unless the saved snapshot already holds exactly those.
+
+    Only the given texts are kept, so the snapshot tracks the current inputs
+    instead of growing with every file ever matched.
+    """
+    if not cache_dir:
+        return
+    cache = normalizer.cache
+    normalized = {t: cache[t] for t in texts if t in cache}
+    if not normalizer.misses and len(normalized) == normalizer.loaded:
+        return
+    path = snapshot_path(cache_dir, normalizer.aliases)
+    snap = {
+        "format": SNAPSHOT_FORMAT,
+        "code": _code_version(),
+        "aliases": [(k, list(v)) for k, v in normalizer.aliases.items()],
+        "normalized": normalized,
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        marshal.dump(snap, f)
+    os.replace(tmp, path)
+
+
+def normalize(text: str, aliases) -> str:
+    """Normalize text using an alias dict or a prebuilt AliasNormalizer."""
+    return get_normalizer(aliases)(text)
 
 
 def tokens(text: str) -> List[str]:
@@ -93,19 +238,145 @@ def token_overlap(a_tokens: List[str], b_tokens: List[str]) -> float:
     return inter / denom if denom else 0.0
 
 
-def char_similarity(a: str, b: str) -> float:
-    return SequenceMatcher(None, a, b).ratio()
+# Pair counters reported by --metrics (cheap enough to keep unconditionally)
+SCORE_STATS: Dict[str, int] = {"pairs": 0, "candidates": 0, "bound_pruned": 0, "full_ratio": 0}
+
 
+@lru_cache(maxsize=8192)
+def _matcher(b: str) -> "SequenceMatcher":
+    # SequenceMatcher indexes seq2 once; reuse it across every topic scored against `b`
+    from difflib import SequenceMatcher
 
-def combined_score(a: str, b: str) -> float:
+    return SequenceMatcher(None, "", b)
+
+
+def char_similarity(a: str, b: str, matcher: Optional["SequenceMatcher"] = None) -> float:
+    m = matcher or _matcher(b)
+    m.set_seq1(a)
+    SCORE_STATS["full_ratio"] += 1
+    return m.ratio()
+
+
+def bounded_char_similarity(
+    a: str, b: str, j: float, o: float, min_score: float, matcher: Optional["SequenceMatcher"] = None
+) -> float:
+    """char_similarity(a, b), or an upper bound on it as soon as that bound
+    already keeps `0.40 * c + 0.30 * j + 0.30 * o` below min_score.
+
+    The length bound (real_quick_ratio) and character-multiset bound
+    (quick_ratio) are tried before the full ratio().
+    """
+    m = matcher or _matcher(b)
+    m.set_seq1(a)
+    for bound in (m.real_quick_ratio, m.quick_ratio):
+        c = bound()
+        if 0.40 * c + 0.30 * j + 0.30 * o < min_score:
+            SCORE_STATS["bound_pruned"] += 1
+            return c
+    SCORE_STATS["full_ratio"] += 1
+    return m.ratio()
+
+
+def combined_score(
+    a: str, b: str, min_score: Optional[float] = None, matcher: Optional["SequenceMatcher"] = None
+) -> float:
+    """Weighted char/Jaccard/overlap score. With min_score, pairs that cannot
+    reach it may return an upper bound (still below min_score) instead.
+
+    matcher is a SequenceMatcher(None, "", b) owned by the caller; by default
+    a shared cached one is used, which is not safe across threads."""
     a_toks, b_toks = tokens(a), tokens(b)
     j = jaccard(a_toks, b_toks)
     o = token_overlap(a_toks, b_toks)
-    c = char_similarity(a, b)
+    if min_score is None:
+        c = char_similarity(a, b, matcher)
+    else:
+        c = bounded_char_similarity(a, b, j, o, min_score, matcher)
     # Weighted combination tuned for topic-question matching
     return 0.40 * c + 0.30 * j + 0.30 * o
 
 
+def length_bound(la: int, lb: int) -> float:
+    """Upper bound on char_similarity() from string lengths alone (real_quick_ratio)."""
+    total = la + lb
+    return 2.0 * min(la, lb) / total if total else 1.0
+
+
+def char_ngrams(text: str, n: int = 3) -> List[str]:
+    if len(text) < n:
+        return [text] if text else []
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+CANDIDATE_MODES = ("all", "index", "certified")
+
+
+class CandidateIndex:
+    """Token and character n-gram inverted index over normalized exam questions.
+
+    `candidates()` returns the indices (ascending, so tie order matches a
+    brute-force scan) of questions worth passing to combined_score().
+    Questions that share tokens with the topic are kept only if their score
+    upper bound (exact Jaccard/overlap from the postings, plus the length
+    bound on char_similarity) reaches min_score, so they are never lost.
+    Questions that share no token can only score via char_similarity:
+      - "certified" keeps every such question whose length bound allows it,
+        which makes the result identical to scoring all pairs;
+      - "index" additionally requires a shared character n-gram.
+    """
+
+    def __init__(self, norm_texts: List[str], n: int = 3):
+        self.n = n
+        self.lengths = [len(t) for t in norm_texts]
+        self.token_counts: List[int] = []
+        self.token_postings: Dict[str, List[int]] = {}
+        self.gram_postings: Dict[str, List[int]] = {}
+        for idx, text in enumerate(norm_texts):
+            toks = set(tokens(text))
+            self.token_counts.append(len(toks))
+            for tok in toks:
+                self.token_postings.setdefault(tok, []).append(idx)
+            for gram in set(char_ngrams(text, n)):
+                self.gram_postings.setdefault(gram, []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def candidates(self, norm_topic: str, min_score: float, mode: str = "certified") -> List[int]:
+        if mode == "all":
+            return list(range(len(self)))
+        topic_toks = set(tokens(norm_topic))
+        la = len(norm_topic)
+        shared: Dict[int, int] = {}
+        for tok in topic_toks:
+            for idx in self.token_postings.get(tok, ()):
+                shared[idx] = shared.get(idx, 0) + 1
+
+        out: List[int] = []
+        for idx, inter in shared.items():
+            nb = self.token_counts[idx]
+            j = inter / (len(topic_toks) + nb - inter)
+            o = inter / min(len(topic_toks), nb)
+            c = length_bound(la, self.lengths[idx])
+            if 0.40 * c + 0.30 * j + 0.30 * o >= min_score:
+                out.append(idx)
+
+        # Pairs without a shared token score 0.40 * char_similarity at most.
+        if 0.40 >= min_score:
+            if mode == "certified":
+                pool = range(len(self))
+            else:
+                grams = set()
+                for gram in set(char_ngrams(norm_topic, self.n)):
+                    grams.update(self.gram_postings.get(gram, ()))
+                pool = grams
+            for idx in pool:
+                if idx not in shared and 0.40 * length_bound(la, self.lengths[idx]) >= min_score:
+                    out.append(idx)
+        out.sort()
+        return out
+
+
 def confidence(score: float) -> str:
     if score >= 0.85:
         return "high"
@@ -153,35 +424,355 @@ def parse_exam(lines: List[str]) -> List[str]:
     return out
 
 
-def match_topics(
+def _columnar():
+    try:
+        from . import columnar
+    except ImportError:
+        import columnar
+    return columnar
+
+
+def is_table_input(path: str) -> bool:
+    """True for a columnar table directory; any other directory is rejected rather than read as text."""
+    if not os.path.isdir(path):
+        return False
+    if not _columnar().is_table(path):
+        raise ValueError(f"{path}: a directory but not a columnar table (no meta.json)")
+    return True
+
+
+def load_slides(path: str) -> List[Tuple[Optional[int], str]]:
+    """Slides from a data/*.txt file or a columnar table directory (see tools/columnar.py)."""
+    if is_table_input(path):
+        # Same stripping and empty-title rule as parse_slides()
+        return [(page, title.strip()) for page, title in _columnar().read_slides(path) if title.strip()]
+    return parse_slides(load_lines(path))
+
+
+def load_exam(path: str) -> List[str]:
+    if is_table_input(path):
+        return parse_exam(_columnar().read_exam(path))
+    return parse_exam(load_lines(path))
+
+
+def score_pairs_python(
+    norm_topics: List[str], norm_exam: List[str], min_score: float, candidates: str = "certified"
+) -> Iterator[List[Tuple[float, int]]]:
+    """Yield, per topic, the (score, question index) pairs reaching min_score in question order."""
+    index = CandidateIndex(norm_exam)
+    bound = None if candidates == "all" else min_score
+    for norm_topic in norm_topics:
+        scored: List[Tuple[float, int]] = []
+        cands = index.candidates(norm_topic, min_score, mode=candidates)
+        SCORE_STATS["pairs"] += len(norm_exam)
+        SCORE_STATS["candidates"] += len(cands)
+        for idx in cands:
+            s = combined_score(norm_topic, norm_exam[idx], bound)
+            if s >= min_score:
+                scored.append((s, idx))
+        yield scored
+
+
+def incidence_matrix(texts: List[str], vocab: Dict[str, int]):
+    """Sparse binary token-incidence matrix (texts x vocab) plus per-row token counts."""
+    import numpy as np
+
+    rows: List[int] = []
+    cols: List[int] = []
+    for r, text in enumerate(texts):
+        for tok in set(tokens(text)):
+            rows.append(r)
+            cols.append(vocab.setdefault(tok, len(vocab)))
+    data = np.ones(len(rows), dtype=np.float64)
+    counts = np.bincount(np.asarray(rows, dtype=np.int64), minlength=len(texts)).astype(np.float64)
+    return (rows, cols, data), counts
+
+
+def score_pairs_numpy(
+    norm_topics: List[str],
+    norm_exam: List[str],
+    min_score: float,
+    candidates: str = "certified",
+    block_size: int = 512,
+) -> Iterator[List[Tuple[float, int]]]:
+    """Batch counterpart of score_pairs_python() using sparse matrix products.
+
+    Jaccard and token_overlap come from the topic x question intersection
+    matrix; char_similarity() is then only evaluated where the block-wide
+    upper bound (length bound on the char term) can still reach min_score,
+    unless candidates == "all". Scores are computed with the same float
+    operations as combined_score(), so both engines agree exactly.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    vocab: Dict[str, int] = {}
+    (q_rows, q_cols, q_data), q_counts = incidence_matrix(norm_exam, vocab)
+    (t_rows, t_cols, t_data), t_counts = incidence_matrix(norm_topics, vocab)
+    Q = sparse.csr_matrix((q_data, (q_rows, q_cols)), shape=(len(norm_exam), len(vocab)))
+    T = sparse.csr_matrix((t_data, (t_rows, t_cols)), shape=(len(norm_topics), len(vocab)))
+    QT = Q.T.tocsc()
+    q_len = np.array([len(t) for t in norm_exam], dtype=np.float64)
+    t_len = np.array([len(t) for t in norm_topics], dtype=np.float64)
+
+    for start in range(0, len(norm_topics), block_size):
+        stop = min(start + block_size, len(norm_topics))
+        inter = (T[start:stop] @ QT).toarray()
+        a = t_counts[start:stop, None]
+        b = q_counts[None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            union = a + b - inter
+            j = np.where((a > 0) & (b > 0), inter / union, 0.0)
+            o = np.where((a > 0) & (b > 0), inter / np.minimum(a, b), 0.0)
+            la = t_len[start:stop, None]
+            total = la + q_len[None, :]
+            c_bound = np.where(total > 0, 2.0 * np.minimum(la, q_len[None, :]) / total, 1.0)
+        if candidates == "all":
+            mask = np.ones(inter.shape, dtype=bool)
+        else:
+            mask = 0.40 * c_bound + 0.30 * j + 0.30 * o >= min_score
+        SCORE_STATS["pairs"] += mask.size
+        SCORE_STATS["candidates"] += int(mask.sum())
+        for r in range(stop - start):
+            norm_topic = norm_topics[start + r]
+            cols = np.flatnonzero(mask[r])
+            if not len(cols):
+                yield []
+                continue
+            if candidates == "all":
+                c = np.array([char_similarity(norm_topic, norm_exam[k]) for k in cols])
+            else:
+                c = np.array(
+                    [bounded_char_similarity(norm_topic, norm_exam[k], j[r, k], o[r, k], min_score) for k in cols]
+                )
+            score = 0.40 * c + 0.30 * j[r, cols] + 0.30 * o[r, cols]
+            keep = score >= min_score
+            yield [(float(sc), int(k)) for sc, k in zip(score[keep], cols[keep])]
+
+
+class SemanticEngine:
+    """Embedding backend: each topic is scored against its top_k questions by cosine similarity.
+
+    Embeddings come from tools/semantic.py ("lsa" or a local sentence-transformers
+    model directory) and are cached under cache_dir by text hash. The score is the
+    cosine similarity clipped to [0, 1]; with rerank it is the mean of the cosine
+    and combined_score(), so string evidence still counts.
+    """
+
+    def __init__(
+        self,
+        model: str = "lsa",
+        cache_dir: str = ".cache/embeddings",
+        top_k: int = 10,
+        rerank: bool = False,
+        dim: int = 128,
+        refit: bool = False,
+    ):
+        self.model = model
+        self.cache_dir = cache_dir
+        self.top_k = top_k
+        self.rerank = rerank
+        self.dim = dim
+        self.refit = refit
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(
+        self, norm_topics: List[str], norm_exam: List[str], min_score: float, candidates: str = "certified"
+    ) -> Iterator[List[Tuple[float, int]]]:
+        try:
+            from . import semantic
+        except ImportError:
+            import semantic
+
+        if not norm_exam:
+            yield from ([] for _ in norm_topics)
+            return
+        model = semantic.load_model(self.model, self.cache_dir, norm_exam + norm_topics, self.dim, self.refit)
+        self.refit = False  # later calls of the same run reuse the fitted model
+        cache = semantic.EmbeddingCache(self.cache_dir, model.model_id)
+        exam_vecs = cache.embed(model, norm_exam)
+        topic_vecs = cache.embed(model, norm_topics)
+        self.hits += cache.hits
+        self.misses += cache.misses
+        k = len(norm_exam) if candidates == "all" else self.top_k
+        for start in range(0, len(norm_topics), 512):
+            idx, sims = semantic.top_k(topic_vecs[start:start + 512], exam_vecs, k)
+            SCORE_STATS["pairs"] += len(idx) * len(norm_exam)
+            SCORE_STATS["candidates"] += idx.size
+            for r in range(len(idx)):
+                norm_topic = norm_topics[start + r]
+                scored: List[Tuple[float, int]] = []
+                for q, cos in zip(idx[r].tolist(), sims[r].tolist()):
+                    s = min(max(cos, 0.0), 1.0)
+                    if self.rerank:
+                        s = 0.5 * s + 0.5 * combined_score(norm_topic, norm_exam[q])
+                    if s >= min_score:
+                        scored.append((s, q))
+                scored.sort(key=itemgetter(1))
+                yield scored
+
+
+ENGINES = {"python": score_pairs_python, "numpy": score_pairs_numpy, "semantic": SemanticEngine()}
+
+
+def open_store(path: str):
+    try:
+        from .score_store import ScoreStore
+    except ImportError:
+        from score_store import ScoreStore
+    return ScoreStore(path)
+
+
+def score_pairs_stored(
+    norm_topics: List[str], norm_exam: List[str], min_score: float, candidates: str, store
+) -> List[List[Tuple[float, int]]]:
+    """score_pairs_python() backed by a ScoreStore: only pairs without a usable stored score are scored."""
+    try:
+        from .score_store import text_hash
+    except ImportError:
+        from score_store import text_hash
+
+    index = CandidateIndex(norm_exam)
+    bound = None if candidates == "all" else min_score
+    topic_hashes = [text_hash(t) for t in norm_topics]
+    exam_hashes = [text_hash(q) for q in norm_exam]
+    known = store.load(topic_hashes)
+    new_rows: List[Tuple[str, str, float, bool]] = []
+    out: List[List[Tuple[float, int]]] = []
+    for norm_topic, th in zip(norm_topics, topic_hashes):
+        scored: List[Tuple[float, int]] = []
+        cands = index.candidates(norm_topic, min_score, mode=candidates)
+        SCORE_STATS["pairs"] += len(norm_exam)
+        SCORE_STATS["candidates"] += len(cands)
+        for idx in cands:
+            key = (th, exam_hashes[idx])
+            hit = known.get(key)
+            if hit is not None and (hit[1] or hit[0] < min_score):
+                s = hit[0]
+                store.reused += 1
+            else:
+                s = combined_score(norm_topic, norm_exam[idx], bound)
+                # below the bound, combined_score() may have returned an upper bound
+                exact = bound is None or s >= bound
+                known[key] = (s, exact)
+                new_rows.append((th, exam_hashes[idx], s, exact))
+                store.scored += 1
+            if s >= min_score:
+                scored.append((s, idx))
+        out.append(scored)
+    store.save(new_rows)
+    return out
+
+
+def ensure_engine(engine: str) -> bool:
+    if engine not in ("numpy", "semantic"):
+        return True
+    try:
+        importlib.import_module("numpy")
+        importlib.import_module("scipy.sparse")
+        return True
+    except Exception:
+        return False
+
+
+ASSIGNMENTS = ("greedy", "optimal")
+
+
+def _max_weight_matching(
+    edges: List[Tuple[int, int, float]], n_topics: int, n_questions: int, topic_cap: int, question_cap: int
+) -> List[int]:
+    """Indices of the edges in a maximum-weight capacitated matching.
+
+    Solved as the linear program max sum(score * x) with 0 <= x <= 1, at
+    most topic_cap edges per topic and question_cap per question. The
+    constraint matrix is a bipartite incidence matrix, which is totally
+    unimodular, so the vertex returned by HiGHS' dual simplex is already
+    integral: no branching is needed.
+    """
+    import numpy as np
+    from scipy import sparse
+    from scipy.optimize import linprog
+
+    n_edges = len(edges)
+    flat = np.array(edges, dtype=np.float64).reshape(n_edges, 3)
+    # Each column (edge) holds a 1 in its topic's row and one in its question's row
+    rows = np.column_stack([flat[:, 0], n_topics + flat[:, 1]]).astype(np.int64).ravel()
+    incidence = sparse.csc_matrix(
+        (np.ones(2 * n_edges), rows, np.arange(0, 2 * n_edges + 1, 2)), shape=(n_topics + n_questions, n_edges)
+    )
+    caps = np.concatenate([np.full(n_topics, float(topic_cap)), np.full(n_questions, float(question_cap))])
+    # HiGHS' presolve finds little to remove in an incidence matrix and costs a quarter of the solve
+    res = linprog(
+        -flat[:, 2], A_ub=incidence, b_ub=caps, bounds=(0, 1), method="highs-ds", options={"presolve": False}
+    )
+    if res.status != 0:
+        raise RuntimeError(f"assignment solver failed: {res.message}")
+    return np.flatnonzero(res.x > 0.5).tolist()
+
+
+def assign_optimal(
+    scored_rows: List[List[Tuple[float, int]]], max_matches: int, question_capacity: int = 1
+) -> List[List[Tuple[float, int]]]:
+    """Globally optimal alternative to taking each topic's top max_matches.
+
+    Chooses topic-question edges (all above min_score already) maximizing
+    the total score, with at most max_matches questions per topic and at
+    most question_capacity topics per question. Requires numpy and scipy.
+    Topics whose questions no other topic can reach simply keep their top
+    max_matches; the rest are solved as one linear program.
+    """
+    out: List[List[Tuple[float, int]]] = [[] for _ in scored_rows]
+    if max_matches <= 0 or question_capacity <= 0:
+        return out
+    degree: Dict[int, int] = {}
+    for row in scored_rows:
+        for _, q in row:
+            degree[q] = degree.get(q, 0) + 1
+    topics: List[int] = []
+    for t, row in enumerate(scored_rows):
+        if all(degree[q] <= question_capacity for _, q in row):
+            # No question of this topic can run out of capacity
+            out[t] = heapq.nlargest(max_matches, row, key=itemgetter(0))
+        else:
+            topics.append(t)
+    if topics:
+        questions = sorted({q for t in topics for _, q in scored_rows[t]})
+        q_local = {q: i for i, q in enumerate(questions)}
+        edges = [(ti, q_local[q], s) for ti, t in enumerate(topics) for s, q in scored_rows[t]]
+        for eid in _max_weight_matching(edges, len(topics), len(questions), max_matches, question_capacity):
+            ti, qi, s = edges[eid]
+            out[topics[ti]].append((s, questions[qi]))
+    for row in out:
+        row.sort(key=lambda x: (-x[0], x[1]))
+    return out
+
+
+def select_matches(
     slides: List[Tuple[Optional[int], str]],
     exam: List[str],
-    aliases: Dict[str, List[str]],
-    min_score: float,
+    scored_rows: Iterable[List[Tuple[float, int]]],
     max_matches: int,
+    matched_exam: Optional[bytearray] = None,
 ) -> Tuple[List[Dict], List[Tuple[Optional[int], str]], List[str]]:
+    """Keep the top max_matches questions per topic (ties in question order).
+
+    Matched questions are tracked by index, so duplicate question texts are
+    counted separately; `matched_exam`, if given, is also updated in place.
+    """
     results: List[Dict] = []
     unmatched_slides: List[Tuple[Optional[int], str]] = []
-    unmatched_exam: List[str] = exam.copy()
+    matched = bytearray(len(exam))
 
-    # Pre-normalize exam questions
-    norm_exam = [(q, normalize(q, aliases)) for q in exam]
-
-    for page, topic in slides:
-        norm_topic = normalize(topic, aliases)
-        scored: List[Tuple[float, str]] = []
-        for orig_q, norm_q in norm_exam:
-            s = combined_score(norm_topic, norm_q)
-            if s >= min_score:
-                scored.append((s, orig_q))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        top = scored[:max_matches]
+    for (page, topic), scored in zip(slides, scored_rows):
+        # nlargest() is stable like sorted(reverse=True), but keeps only a max_matches heap
+        top = heapq.nlargest(max_matches, scored, key=itemgetter(0))
         if not top:
             unmatched_slides.append((page, topic))
             continue
-        for s, q in top:
-            if q in unmatched_exam:
-                unmatched_exam.remove(q)
+        for s, idx in top:
+            q = exam[idx]
+            matched[idx] = 1
             results.append(
                 {
                     "page": page,
@@ -192,12 +783,349 @@ def match_topics(
                 }
             )
 
+    if matched_exam is not None:
+        for idx, flag in enumerate(matched):
+            if flag:
+                matched_exam[idx] = 1
+    unmatched_exam = [q for q, flag in zip(exam, matched) if not flag]
     return results, unmatched_slides, unmatched_exam
 
 
-def write_csv(rows: List[Dict], path: str) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    fieldnames = ["page", "slide_topic", "exam_question", "score", "confidence"]
+def group_topics(norm_topics: List[str]) -> Tuple[List[str], List[int]]:
+    """Unique normalized topics (first-seen order) and, per topic, its index among them."""
+    ids: Dict[str, int] = {}
+    topic_ids = [ids.setdefault(t, len(ids)) for t in norm_topics]
+    return list(ids), topic_ids
+
+
+BOILERPLATE_PATTERNS = [
+    r"^(?:agenda|outline|overview of (?:the )?lecture|(?:table of )?contents)$",
+    r"^(?:thank you|thanks|questions)\b",
+    r"^(?:prof|dr)\.?\s",  # lecturer title pages, e.g. "Prof. Dr. ..."
+]
+
+
+def filter_boilerplate(
+    slides: List[Tuple[Optional[int], str]], patterns: List[str] = BOILERPLATE_PATTERNS
+) -> Tuple[List[Tuple[Optional[int], str]], List[Tuple[Optional[int], str]]]:
+    """Split slides into (kept, skipped) so non-topics such as "Agenda" never reach scoring."""
+    boilerplate = re.compile("|".join(f"(?:{p})" for p in patterns), re.I)
+    kept: List[Tuple[Optional[int], str]] = []
+    skipped: List[Tuple[Optional[int], str]] = []
+    for page, topic in slides:
+        (skipped if boilerplate.search(topic.strip()) else kept).append((page, topic))
+    return kept, skipped
+
+
+def match_topics(
+    slides: List[Tuple[Optional[int], str]],
+    exam: List[str],
+    aliases: Dict[str, List[str]],
+    min_score: float,
+    max_matches: int,
+    candidates: str = "certified",
+    engine: str = "python",
+    store=None,
+    assignment: str = "greedy",
+    question_capacity: int = 1,
+) -> Tuple[List[Dict], List[Tuple[Optional[int], str]], List[str]]:
+    normalizer = get_normalizer(aliases)
+    with METRICS.stage("normalize"):
+        # Pre-normalize exam questions
+        norm_exam = [normalizer(q) for q in exam]
+        unique_topics, topic_ids = group_topics([normalizer(topic) for _, topic in slides])
+    with METRICS.stage("score"):
+        if store is not None:
+            unique_rows = score_pairs_stored(unique_topics, norm_exam, min_score, candidates, store)
+        else:
+            unique_rows = list(resolve_engine(engine)(unique_topics, norm_exam, min_score, candidates))
+        # Repeated titles share one scored row
+        scored_rows = [unique_rows[u] for u in topic_ids]
+        if assignment == "optimal":
+            scored_rows = assign_optimal(list(scored_rows), max_matches, question_capacity)
+        return select_matches(slides, exam, scored_rows, max_matches)
+
+
+def resolve_engine(engine):
+    """An ENGINES name, or a configured scorer such as SemanticEngine(...)."""
+    return ENGINES[engine] if isinstance(engine, str) else engine
+
+
+# Per-process state for match_chapters(): exam questions are normalized once per worker.
+_worker: Dict = {}
+
+
+def _init_worker(exam: List[str], aliases: Dict[str, List[str]], engine: str, store=None) -> None:
+    normalizer = get_normalizer(aliases)
+    _worker["normalizer"] = normalizer
+    _worker["norm_exam"] = [normalizer(q) for q in exam]
+    _worker["engine"] = engine
+    _worker["store"] = store
+
+
+def score_counters(normalizer: AliasNormalizer) -> Dict[str, int]:
+    return {
+        **SCORE_STATS,
+        "alias_substitutions": normalizer.substitutions,
+        "normalize_cache_hits": normalizer.hits,
+        "normalize_cache_misses": normalizer.misses,
+    }
+
+
+def _score_block(
+    norm_topics: List[str], min_score: float, candidates: str
+) -> Tuple[List[List[Tuple[float, int]]], Dict[str, int]]:
+    """Score one block of normalized topics; also returns the counter deltas so the parent can aggregate them.
+
+    The time spent is added to the "score_blocks" stage: summed over pool
+    workers (see measured()), it is the CPU time behind the "score" wall time.
+    """
+    start = time.perf_counter()
+    normalizer = _worker["normalizer"]
+    before = score_counters(normalizer)
+    if _worker["store"] is not None:
+        rows = score_pairs_stored(norm_topics, _worker["norm_exam"], min_score, candidates, _worker["store"])
+    else:
+        rows = list(resolve_engine(_worker["engine"])(norm_topics, _worker["norm_exam"], min_score, candidates))
+    after = score_counters(normalizer)
+    if METRICS.enabled:
+        METRICS.add_time("score_blocks", time.perf_counter() - start)
+    return rows, {k: after[k] - before[k] for k in after}
+
+
+def score_chapters(
+    chapters: List[Tuple[str, List[Tuple[Optional[int], str]]]],
+    exam: List[str],
+    aliases: Dict[str, List[str]],
+    min_score: float,
+    candidates: str = "certified",
+    engine: str = "python",
+    workers: int = 1,
+    block_size: int = 256,
+    store=None,
+) -> List[List[List[Tuple[float, int]]]]:
+    """Per chapter and slide, the (score, question index) pairs reaching min_score.
+
+    Topics are normalized here and identical ones are scored once across all
+    chapters. The unique topics are sharded into blocks; with workers > 1
+    they run on a process pool whose workers each normalize the exam bank once.
+    With a ScoreStore, blocks are scored in this process against the store.
+    A SemanticEngine gets all unique topics in one call.
+    """
+    normalizer = get_normalizer(aliases)
+    before = score_counters(normalizer)
+    unique_topics, topic_ids = group_topics([normalizer(topic) for _, slides in chapters for _, topic in slides])
+    after = score_counters(normalizer)
+    METRICS.merge({k: after[k] - before[k] for k in after})
+
+    if isinstance(resolve_engine(engine), SemanticEngine):
+        # One call per run: the LSA model is fitted on all topics and the exam
+        # bank is embedded (and counted as cache hits) once, whatever --block-size
+        block_size = max(1, len(unique_topics))
+    starts = range(0, len(unique_topics), block_size)
+    blocks: Dict[int, List[List[Tuple[float, int]]]] = {}
+    # The semantic engine embeds in batches and shares one on-disk cache, so it runs inline
+    if workers > 1 and len(starts) > 1 and store is None and engine in ("python", "numpy"):
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Forked workers inherit these, and the normalizer snapshot then covers the exam bank too
+        before = score_counters(normalizer)
+        for q in exam:
+            normalizer(q)
+        after = score_counters(normalizer)
+        METRICS.merge({k: after[k] - before[k] for k in after})
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(exam, aliases, engine)
+        ) as pool:
+            futures = {
+                start: pool.submit(
+                    measured, METRICS.settings(), "score", _score_block,
+                    unique_topics[start:start + block_size], min_score, candidates,
+                )
+                for start in starts
+            }
+            for start, fut in futures.items():
+                (blocks[start], counters), delta = fut.result()
+                METRICS.merge(counters)
+                METRICS.merge_worker(delta)
+    else:
+        _init_worker(exam, aliases, engine, store)
+        for start in starts:
+            blocks[start], counters = _score_block(unique_topics[start:start + block_size], min_score, candidates)
+            METRICS.merge(counters)
+
+    unique_rows = [row for start in starts for row in blocks[start]]
+    chapter_rows: List[List[List[Tuple[float, int]]]] = []
+    offset = 0
+    for _, slides in chapters:
+        chapter_rows.append([unique_rows[u] for u in topic_ids[offset:offset + len(slides)]])
+        offset += len(slides)
+    return chapter_rows
+
+
+def select_chapters(
+    chapters: List[Tuple[str, List[Tuple[Optional[int], str]]]],
+    exam: List[str],
+    chapter_rows: List[List[List[Tuple[float, int]]]],
+    max_matches: int,
+    matched_exam: Optional[bytearray] = None,
+    assignment: str = "greedy",
+    question_capacity: int = 1,
+) -> List[Tuple[str, List[Dict], List[Tuple[Optional[int], str]], List[str]]]:
+    """select_matches() per chapter; with assignment="optimal", question capacities apply across all chapters."""
+    if assignment == "optimal":
+        assigned = assign_optimal([row for rows in chapter_rows for row in rows], max_matches, question_capacity)
+        offsets = [0]
+        for rows in chapter_rows:
+            offsets.append(offsets[-1] + len(rows))
+        chapter_rows = [assigned[offsets[ci]:offsets[ci + 1]] for ci in range(len(chapters))]
+
+    out = []
+    for (source, slides), scored_rows in zip(chapters, chapter_rows):
+        out.append((source, *select_matches(slides, exam, scored_rows, max_matches, matched_exam)))
+    return out
+
+
+def match_chapters(
+    chapters: List[Tuple[str, List[Tuple[Optional[int], str]]]],
+    exam: List[str],
+    aliases: Dict[str, List[str]],
+    min_score: float,
+    max_matches: int,
+    candidates: str = "certified",
+    engine: str = "python",
+    workers: int = 1,
+    block_size: int = 256,
+    store=None,
+    matched_exam: Optional[bytearray] = None,
+    assignment: str = "greedy",
+    question_capacity: int = 1,
+) -> List[Tuple[str, List[Dict], List[Tuple[Optional[int], str]], List[str]]]:
+    """Match several chapters' slides against one exam bank (score_chapters() + select_chapters()).
+
+    Returns (source, results, unmatched_slides, unmatched_exam) per chapter,
+    in input order; the outcome does not depend on the number of workers.
+    `matched_exam` (one byte per question) collects matches across all chapters.
+    """
+    chapter_rows = score_chapters(
+        chapters, exam, aliases, min_score, candidates, engine, workers, block_size, store
+    )
+    return select_chapters(chapters, exam, chapter_rows, max_matches, matched_exam, assignment, question_capacity)
+
+
+def sweep(
+    chapters: List[Tuple[str, List[Tuple[Optional[int], str]]]],
+    exam: List[str],
+    chapter_rows: List[List[List[Tuple[float, int]]]],
+    min_scores: List[float],
+    max_matches_list: List[int],
+    assignment: str = "greedy",
+    question_capacity: int = 1,
+) -> Iterator[Tuple[float, int, List[Tuple[str, List[Dict], List[Tuple[Optional[int], str]], List[str]]], bytearray]]:
+    """Selections for every (min_score, max_matches) setting from one scoring pass.
+
+    chapter_rows must come from score_chapters() at min(min_scores): raising
+    the threshold only drops pairs, and every kept score is exact, so each
+    setting matches a separate run with that --min-score/--max-matches.
+    Yields (min_score, max_matches, per_chapter, matched_exam) per setting.
+    """
+    for min_score in min_scores:
+        rows = [[[(s, q) for s, q in row if s >= min_score] for row in rows] for rows in chapter_rows]
+        for max_matches in max_matches_list:
+            matched_exam = bytearray(len(exam))
+            per_chapter = select_chapters(
+                chapters, exam, rows, max_matches, matched_exam, assignment, question_capacity
+            )
+            yield min_score, max_matches, per_chapter, matched_exam
+
+
+SWEEP_FIELDNAMES = [
+    "min_score",
+    "max_matches",
+    "matched_pairs",
+    "matched_topics",
+    "unmatched_topics",
+    "unmatched_questions",
+    "low_confidence",
+    "out",
+]
+
+
+def sweep_path(out: str, min_score: float, max_matches: int) -> str:
+    """results/mapped_topics.csv -> results/mapped_topics_0.6_max3.csv
+
+    The score is written in full (repr), so distinct thresholds such as
+    0.725 and 0.72 never share a file.
+    """
+    stem, ext = os.path.splitext(out)
+    return f"{stem}_{min_score!r}_max{max_matches}{ext or '.csv'}"
+
+
+def sweep_summary(
+    min_score: float,
+    max_matches: int,
+    n_slides: int,
+    per_chapter: List[Tuple[str, List[Dict], List[Tuple[Optional[int], str]], List[str]]],
+    matched_exam: bytearray,
+    out: str,
+) -> Dict:
+    """One SWEEP_FIELDNAMES row: how many pairs, slide topics and questions a setting matches."""
+    results = [r for _, rows, _, _ in per_chapter for r in rows]
+    unmatched_topics = sum(len(unmatched) for _, _, unmatched, _ in per_chapter)
+    return {
+        "min_score": min_score,
+        "max_matches": max_matches,
+        "matched_pairs": len(results),
+        "matched_topics": n_slides - unmatched_topics,
+        "unmatched_topics": unmatched_topics,
+        "unmatched_questions": len(matched_exam) - sum(matched_exam),
+        "low_confidence": sum(r["confidence"] == "low" for r in results),
+        "out": out,
+    }
+
+
+def print_sweep_table(rows: List[Dict]) -> None:
+    print(f"{'min_score':>9} {'max':>4} {'pairs':>6} {'topics':>6} {'unmatched topics':>16} {'unmatched questions':>19} {'low':>5}")
+    for r in rows:
+        print(
+            f"{r['min_score']!r:>9} {r['max_matches']:>4} {r['matched_pairs']:>6} {r['matched_topics']:>6} "
+            f"{r['unmatched_topics']:>16} {r['unmatched_questions']:>19} {r['low_confidence']:>5}"
+        )
+
+
+def chapter_slug(pdf_path: str) -> str:
+    """`slides/Chapter 2 - Data.pdf` -> `chapter_2_-_data` (the data/ file naming)."""
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return "_".join(stem.lower().split())
+
+
+def chapter_source(path: str) -> str:
+    """`data/slides_topics__chapter_2_-_data.txt` -> `chapter_2_-_data` (the results/ `source` column)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    prefix = "slides_topics__"
+    return stem[len(prefix):] if stem.startswith(prefix) else stem
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    paths: List[str] = []
+    for pat in patterns:
+        if any(ch in pat for ch in "*?["):
+            import glob
+
+            paths.extend(sorted(glob.glob(pat)))
+        else:
+            paths.append(pat)
+    return paths
+
+
+FIELDNAMES = ["page", "slide_topic", "exam_question", "score", "confidence"]
+
+
+def write_csv(rows: List[Dict], path: str, fieldnames: List[str] = FIELDNAMES) -> None:
+    import csv
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     with open(path, "w", encoding="utf-8", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
@@ -205,31 +1133,30 @@ def write_csv(rows: List[Dict], path: str) -> None:
             writer.writerow(r)
 
 
-def main():
-    ap = argparse.ArgumentParser(description="Match slide topics to exam questions (fuzzy)")
-    ap.add_argument("--slides", required=True, help="Path to slides topics .txt (one per line or 'page|topic')")
-    ap.add_argument("--exam", required=True, help="Path to exam questions .txt (one question per line)")
-    ap.add_argument("--aliases", help="Optional JSON mapping canonical->list of synonyms")
-    ap.add_argument("--out", default="results/mapped_topics.csv", help="Output CSV path")
-    ap.add_argument("--min-score", type=float, default=0.72, help="Min combined score to consider a match (0-1)")
-    ap.add_argument("--max-matches", type=int, default=2, help="Max exam questions per slide topic")
-    args = ap.parse_args()
-
-    aliases = load_aliases(args.aliases)
-    slide_lines = load_lines(args.slides)
-    exam_lines = load_lines(args.exam)
-
-    slides = parse_slides(slide_lines)
-    exam = parse_exam(exam_lines)
+def write_chapters(
+    per_chapter: List[Tuple[str, List[Dict], List[Tuple[Optional[int], str]], List[str]]], out: str
+) -> Tuple[List[Dict], List[Tuple[Optional[int], str]]]:
+    """Write mapped_topics__<source>.csv per chapter next to `out` and the combined CSV (with a `source` column).
 
-    results, unmatched_slides, unmatched_exam = match_topics(
-        slides, exam, aliases, min_score=args.min_score, max_matches=args.max_matches
-    )
+    Returns the combined rows and all unmatched slides.
+    """
+    out_dir = os.path.dirname(out)
+    all_rows: List[Dict] = []
+    all_unmatched_slides: List[Tuple[Optional[int], str]] = []
+    for source, results, unmatched_slides, _ in per_chapter:
+        write_csv(results, os.path.join(out_dir, f"mapped_topics__{source}.csv"))
+        all_rows.extend({"source": source, **r} for r in results)
+        all_unmatched_slides.extend(unmatched_slides)
+    write_csv(all_rows, out, fieldnames=["source"] + FIELDNAMES)
+    print(f"Per-chapter CSVs written to: {out_dir or '.'} ({len(per_chapter)} chapters)")
+    return all_rows, all_unmatched_slides
 
-    write_csv(results, args.out)
 
+def print_summary(
+    out: str, results: List[Dict], unmatched_slides: List[Tuple[Optional[int], str]], unmatched_exam: List[str]
+) -> None:
     # Also print a brief summary to stdout
-    print(f"Matches written to: {args.out}")
+    print(f"Matches written to: {out}")
     print(f"Matched pairs: {len(results)} (topics x questions)")
     if unmatched_slides:
         print(f"Unmatched slide topics: {len(unmatched_slides)}")
@@ -245,6 +1172,269 @@ def main():
             print(f"[score={r['score']}] page {p} | {r['slide_topic']}  <->  {r['exam_question']}")
 
 
+def print_store_summary(store) -> None:
+    if store is None:
+        return
+    print(f"Score store: {store.scored} pairs scored, {store.reused} reused")
+    store.close()
+
+
+def record_metrics(store) -> None:
+    if store is not None:
+        METRICS.count("store_scored", store.scored)
+        METRICS.count("store_reused", store.reused)
+    c = METRICS.counters
+    METRICS.rate("pairs_per_sec", c.get("pairs", 0), "score")
+    METRICS.ratio("candidate_ratio", c.get("candidates", 0), c.get("pairs", 0))
+    METRICS.ratio("bound_pruned_ratio", c.get("bound_pruned", 0), c.get("candidates", 0))
+    hits, misses = c.get("normalize_cache_hits", 0), c.get("normalize_cache_misses", 0)
+    METRICS.ratio("normalize_cache_hit_rate", hits, hits + misses)
+    reused, scored = c.get("store_reused", 0), c.get("store_scored", 0)
+    METRICS.ratio("store_hit_rate", reused, reused + scored)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Match slide topics to exam questions (fuzzy)")
+    ap.add_argument(
+        "--slides",
+        required=True,
+        nargs="+",
+        help="Path(s) or glob(s) of slides topics .txt (one per line or 'page|topic') or .cols tables; several files write "
+        "per-chapter CSVs next to --out plus a combined CSV with a 'source' column",
+    )
+    ap.add_argument("--exam", required=True, help="Path to exam questions .txt (one question per line) or .cols table")
+    ap.add_argument("--aliases", help="Optional JSON mapping canonical->list of synonyms")
+    ap.add_argument("--out", default="results/mapped_topics.csv", help="Output CSV path")
+    ap.add_argument(
+        "--pairs-out",
+        help="Also write the matches as a columnar table directory (e.g. results/mapped_topics.cols; requires numpy)",
+    )
+    ap.add_argument("--min-score", type=float, default=0.72, help="Min combined score to consider a match (0-1)")
+    ap.add_argument("--max-matches", type=int, default=2, help="Max exam questions per slide topic")
+    ap.add_argument(
+        "--candidates",
+        choices=CANDIDATE_MODES,
+        default="certified",
+        help="Candidate generation: 'all' scores every pair, 'certified' prunes only pairs that provably "
+        "cannot reach --min-score (identical output), 'index' also drops pairs without a shared token or n-gram",
+    )
+    ap.add_argument(
+        "--engine",
+        choices=sorted(ENGINES),
+        default="python",
+        help="Scoring backend: pure-Python per pair, batched sparse matrices, or embedding similarity "
+        "(numpy and semantic require numpy and scipy)",
+    )
+    ap.add_argument(
+        "--embed-model",
+        default="lsa",
+        help="--engine semantic: 'lsa' (TF-IDF + truncated SVD, no downloads) or a local sentence-transformers model directory",
+    )
+    ap.add_argument("--embed-cache", default=".cache/embeddings", help="Directory for the LSA model and cached embeddings")
+    ap.add_argument("--embed-dim", type=int, default=128, help="LSA dimensions (used when the model is fitted)")
+    ap.add_argument("--refit", action="store_true", help="Refit the cached LSA model on this run's texts instead of folding them in")
+    ap.add_argument("--top-k", type=int, default=10, help="--engine semantic: questions retrieved per topic")
+    ap.add_argument(
+        "--rerank",
+        action="store_true",
+        help="--engine semantic: score retrieved pairs as the mean of cosine similarity and the string score",
+    )
+    ap.add_argument(
+        "--sweep-min-score",
+        nargs="+",
+        type=float,
+        metavar="SCORE",
+        help="Sweep mode: score all pairs once and write one CSV per --sweep-min-score x --sweep-max-matches "
+        "setting (<out>_<score>_max<n>.csv) plus a summary table",
+    )
+    ap.add_argument("--sweep-max-matches", nargs="+", type=int, metavar="N", help="Sweep mode: max-matches values")
+    ap.add_argument("--sweep-summary", help="Sweep mode: summary CSV path (default: <out>_sweep.csv)")
+    ap.add_argument(
+        "--norm-cache",
+        default=".cache/normalize",
+        help="Directory for the snapshot of normalized texts per alias map (read in one go on start-up)",
+    )
+    ap.add_argument("--no-norm-cache", action="store_true", help="Neither read nor write the normalized-text snapshot")
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes for multi-chapter matching")
+    ap.add_argument("--block-size", type=int, default=256, help="Slide topics per worker task")
+    ap.add_argument(
+        "--store",
+        help="SQLite score store for incremental re-matching: only new or changed topics/questions are scored",
+    )
+    ap.add_argument(
+        "--assign",
+        choices=ASSIGNMENTS,
+        default="greedy",
+        help="'greedy' gives every topic its own top --max-matches; 'optimal' maximizes the total score with "
+        "at most --question-capacity topics per question",
+    )
+    ap.add_argument("--question-capacity", type=int, default=1, help="Max slide topics per exam question (--assign optimal)")
+    ap.add_argument(
+        "--skip-boilerplate",
+        action="store_true",
+        help="Leave out non-topic slides (Agenda, Outline, lecturer title pages, ...) before scoring",
+    )
+    ap.add_argument(
+        "--boilerplate",
+        action="append",
+        default=[],
+        metavar="REGEX",
+        help="Extra case-insensitive pattern for --skip-boilerplate (repeatable)",
+    )
+    ap.add_argument("--metrics", help="Write stage timings and pair/alias/cache counters as JSON to this path")
+    ap.add_argument("--profile", help="Directory for per-stage cProfile dumps (<tool>.<stage>.prof)")
+    args = ap.parse_args()
+    METRICS.configure("match_topics", args.metrics, args.profile)
+
+    if not ensure_engine(args.engine):
+        print(f"ERROR: --engine {args.engine} requires numpy and scipy.")
+        print("Install them first, e.g.:\n  python3 -m pip install numpy scipy")
+        sys.exit(2)
+    if args.assign == "optimal" and not ensure_engine("numpy"):
+        print("ERROR: --assign optimal requires numpy and scipy.")
+        print("Install them first, e.g.:\n  python3 -m pip install numpy scipy")
+        sys.exit(2)
+
+    uses_tables = args.pairs_out or os.path.isdir(args.exam) or any(map(os.path.isdir, expand_inputs(args.slides)))
+    if uses_tables:
+        import importlib.util
+
+        if importlib.util.find_spec("numpy") is None:
+            print("ERROR: columnar tables (.cols) require numpy.")
+            print("Install it first, e.g.:\n  python3 -m pip install numpy")
+            sys.exit(2)
+        for path, kind in [(args.exam, "exam")] + [(p, "slides") for p in expand_inputs(args.slides)]:
+            if not os.path.isdir(path):
+                continue
+            if not _columnar().is_table(path):
+                print(f"ERROR: {path} is a directory but not a columnar table (no meta.json).")
+                sys.exit(2)
+            try:
+                _columnar().Table(path, kind)
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                sys.exit(2)
+        if args.pairs_out:
+            try:
+                _columnar().check_target(args.pairs_out)
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                sys.exit(2)
+
+    with METRICS.stage("load"):
+        aliases = load_aliases(args.aliases)
+        norm_cache = None if args.no_norm_cache else args.norm_cache
+        normalizer = load_normalizer(aliases, norm_cache)
+        exam = load_exam(args.exam)
+        slide_paths = expand_inputs(args.slides)
+    inputs = list(exam)  # what the normalizer snapshot keeps
+    if not slide_paths:
+        print(f"ERROR: no slides files match: {' '.join(args.slides)}")
+        sys.exit(2)
+
+    store = open_store(args.store) if args.store else None
+    engine = args.engine
+    if engine == "semantic":
+        if store is not None:
+            print("ERROR: --store caches string scores; it cannot be combined with --engine semantic.")
+            sys.exit(2)
+        try:
+            if args.embed_model != "lsa":
+                importlib.import_module("sentence_transformers")
+        except Exception:
+            print("ERROR: --embed-model DIR requires sentence-transformers.")
+            print("Install it first, e.g.:\n  python3 -m pip install sentence-transformers")
+            sys.exit(2)
+        engine = SemanticEngine(
+            args.embed_model, args.embed_cache, top_k=args.top_k, rerank=args.rerank, dim=args.embed_dim, refit=args.refit
+        )
+
+    def load_chapter(path: str) -> List[Tuple[Optional[int], str]]:
+        slides = load_slides(path)
+        if args.skip_boilerplate:
+            slides, skipped = filter_boilerplate(slides, BOILERPLATE_PATTERNS + args.boilerplate)
+            METRICS.count("boilerplate_skipped", len(skipped))
+        inputs.extend(topic for _, topic in slides)
+        return slides
+
+    if args.sweep_min_score or args.sweep_max_matches:
+        if args.pairs_out:
+            print("ERROR: --pairs-out cannot be combined with a sweep.")
+            sys.exit(2)
+        min_scores = sorted(set(args.sweep_min_score or [args.min_score]))
+        max_matches_list = sorted(set(args.sweep_max_matches or [args.max_matches]))
+        with METRICS.stage("load"):
+            chapters = [(chapter_source(p), load_chapter(p)) for p in slide_paths]
+        with METRICS.stage("score"):
+            # Once, at the lowest threshold; every setting filters the same rows
+            chapter_rows = score_chapters(
+                chapters, exam, aliases, min(min_scores), candidates=args.candidates, engine=engine,
+                workers=args.workers, block_size=args.block_size, store=store,
+            )
+        fieldnames = FIELDNAMES if len(chapters) == 1 else ["source"] + FIELDNAMES
+        n_slides = sum(len(slides) for _, slides in chapters)
+        summary: List[Dict] = []
+        with METRICS.stage("write"):
+            for min_score, max_matches, per_chapter, matched_exam in sweep(
+                chapters, exam, chapter_rows, min_scores, max_matches_list,
+                assignment=args.assign, question_capacity=args.question_capacity,
+            ):
+                out = sweep_path(args.out, min_score, max_matches)
+                if len(chapters) == 1:
+                    rows = per_chapter[0][1]
+                else:
+                    rows = [{"source": source, **r} for source, results, _, _ in per_chapter for r in results]
+                write_csv(rows, out, fieldnames=fieldnames)
+                summary.append(sweep_summary(min_score, max_matches, n_slides, per_chapter, matched_exam, out))
+            summary_path = args.sweep_summary or f"{os.path.splitext(args.out)[0]}_sweep.csv"
+            write_csv(summary, summary_path, fieldnames=SWEEP_FIELDNAMES)
+        METRICS.count("sweep_settings", len(summary))
+        print(f"Sweep: {len(summary)} settings from one scoring pass at min-score {min(min_scores)}")
+        print_sweep_table(summary)
+        print(f"Summary written to: {summary_path}")
+    elif len(slide_paths) == 1:
+        with METRICS.stage("load"):
+            slides = load_chapter(slide_paths[0])
+        results, unmatched_slides, unmatched_exam = match_topics(
+            slides, exam, aliases, min_score=args.min_score, max_matches=args.max_matches,
+            candidates=args.candidates, engine=engine, store=store,
+            assignment=args.assign, question_capacity=args.question_capacity,
+        )
+        METRICS.merge(score_counters(get_normalizer(aliases)))
+        with METRICS.stage("write"):
+            write_csv(results, args.out)
+            if args.pairs_out:
+                _columnar().write_pairs(args.pairs_out, results, FIELDNAMES)
+        print_summary(args.out, results, unmatched_slides, unmatched_exam)
+    else:
+        with METRICS.stage("load"):
+            chapters = [(chapter_source(p), load_chapter(p)) for p in slide_paths]
+        matched_exam = bytearray(len(exam))
+        with METRICS.stage("score"):
+            per_chapter = match_chapters(
+                chapters, exam, aliases, min_score=args.min_score, max_matches=args.max_matches,
+                candidates=args.candidates, engine=engine, workers=args.workers, block_size=args.block_size,
+                store=store, matched_exam=matched_exam,
+                assignment=args.assign, question_capacity=args.question_capacity,
+            )
+        with METRICS.stage("write"):
+            all_rows, all_unmatched_slides = write_chapters(per_chapter, args.out)
+            if args.pairs_out:
+                _columnar().write_pairs(args.pairs_out, all_rows, ["source"] + FIELDNAMES)
+        unmatched_exam = [q for q, flag in zip(exam, matched_exam) if not flag]
+        print_summary(args.out, all_rows, all_unmatched_slides, unmatched_exam)
+
+    if args.skip_boilerplate:
+        print(f"Skipped boilerplate slide topics: {METRICS.counters.get('boilerplate_skipped', 0)}")
+    if isinstance(engine, SemanticEngine):
+        METRICS.count("embedding_cache_hits", engine.hits)
+        METRICS.count("embeddings_computed", engine.misses)
+        print(f"Embeddings: {engine.misses} computed, {engine.hits} from cache ({args.embed_cache})")
+    record_metrics(store)
+    print_store_summary(store)
+    save_normalizer(normalizer, norm_cache, inputs)
+    METRICS.write(args.metrics)
+
+
 if __name__ == "__main__":
     main()
-
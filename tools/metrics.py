@@ -0,0 +1,177 @@
+"""
+Opt-in stage timings, counters and cProfile dumps for the tools.
+
+Each tool's --metrics PATH / --profile DIR flags configure the shared
+METRICS instance; when neither is given, stage() is a no-op.
+
+  with METRICS.stage("layout"):
+      ...
+  METRICS.count("pages", n)
+  METRICS.write(path)          # {"stages": {name: seconds}, "counters": {...}, "rates": {...}}
+
+With a profile directory, every stage is also run under cProfile and its
+stats are dumped to DIR/<tool>.<stage>.prof (inspect with `python3 -m pstats`).
+Work submitted to process pools goes through measured(), which returns the
+worker's timings and counters with its result (merge them with
+METRICS.merge_worker()) and profiles it into DIR/<tool>.<name>.<pid>.prof.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.tool = "tools"
+        self.profile_dir: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.rates: Dict[str, float] = {}
+
+    def configure(self, tool: str, metrics_path: Optional[str] = None, profile_dir: Optional[str] = None) -> None:
+        self.tool = tool
+        self.enabled = bool(metrics_path or profile_dir)
+        self.profile_dir = profile_dir
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            with self.profiled(name):
+                yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    @contextmanager
+    def profiled(self, name: str):
+        """With a profile directory, profile the block into DIR/<tool>.<name>.prof."""
+        if not self.profile_dir:
+            yield
+            return
+        import cProfile  # only when profiling; the tools import this module on start-up
+
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(os.path.join(self.profile_dir, f"{self.tool}.{name}.prof"))
+
+    def timed(self, iterable: Iterable, name: str) -> Iterator:
+        """Iterate, adding the time spent producing each item to stage `name` (e.g. pdfminer layout)."""
+        if not self.enabled:
+            yield from iterable
+            return
+        it = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - start)
+                return
+            self.add_time(name, time.perf_counter() - start)
+            yield item
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, counters: Dict[str, float]) -> None:
+        for name, n in counters.items():
+            self.count(name, n)
+
+    def settings(self) -> Tuple[str, bool, Optional[str]]:
+        """What a worker process needs to record like this one (see measured())."""
+        return self.tool, self.enabled, self.profile_dir
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {"stages": dict(self.stages), "counters": dict(self.counters)}
+
+    def since(self, before: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        """Stage seconds and counters added after snapshot() returned `before`."""
+        return {
+            kind: {k: v - before[kind].get(k, 0) for k, v in current.items() if v != before[kind].get(k, 0)}
+            for kind, current in self.snapshot().items()
+        }
+
+    def merge_worker(self, delta: Dict[str, Dict[str, float]]) -> None:
+        """Add what a worker recorded (the second item returned by measured())."""
+        for name, seconds in delta["stages"].items():
+            self.add_time(name, seconds)
+        self.merge(delta["counters"])
+
+    def rate(self, name: str, numerator: float, stage: str) -> None:
+        """Record numerator per second of the given stage, e.g. pages/sec."""
+        seconds = self.stages.get(stage)
+        if seconds:
+            self.rates[name] = round(numerator / seconds, 3)
+
+    def ratio(self, name: str, part: float, total: float) -> None:
+        if total:
+            self.rates[name] = round(part / total, 4)
+
+    def report(self) -> Dict:
+        return {
+            "tool": self.tool,
+            "stages": {k: round(v, 6) for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+            "rates": dict(self.rates),
+        }
+
+    def write(self, path: Optional[str]) -> None:
+        if not path:
+            return
+        import json
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"Metrics written to: {path}")
+
+
+METRICS = Metrics()
+_worker_profiles: Dict[str, "cProfile.Profile"] = {}
+
+
+def measured(settings: Tuple[str, bool, Optional[str]], name: str, fn: Callable, *args):
+    """Run fn(*args) in a pool worker; returns (result, metrics delta) for METRICS.merge_worker().
+
+    Stage times and counters recorded in the worker would otherwise be lost
+    with its process. With a profile directory the call is profiled into
+    DIR/<tool>.<name>.<pid>.prof, accumulated over every call the worker runs,
+    so workers do not overwrite each other's dumps.
+    """
+    tool, enabled, profile_dir = settings
+    # Stages inside the worker only time themselves: cProfile cannot nest, so
+    # the whole call is profiled once here instead.
+    METRICS.configure(tool, None, None)
+    METRICS.enabled = enabled
+    before = METRICS.snapshot()
+    if not profile_dir:
+        return fn(*args), METRICS.since(before)
+    prof = _worker_profiles.get(name)
+    if prof is None:
+        import cProfile
+
+        prof = _worker_profiles[name] = cProfile.Profile()
+    prof.enable()
+    try:
+        result = fn(*args)
+    finally:
+        prof.disable()
+        prof.dump_stats(os.path.join(profile_dir, f"{tool}.{name}.{os.getpid()}.prof"))
+    return result, METRICS.since(before)
@@ -5,19 +5,65 @@ End-to-end pipeline to produce a mapping CSV:
   2) Extract exam questions/topics from exam PDF
   3) Fuzzy-match slide topics to exam items and export a CSV
 
+All stages run in one process (the two extractions concurrently, in worker
+processes) and pass their results in memory; the data/*.txt intermediates
+are only written when requested.
+
 Usage:
   python3 tools/run_pipeline.py \
     --slides-pdf "KDDM - data - 2.pdf" \
     --exam-pdf "Exam_Questions_Summary.pdf" \
     --out results/mapped_topics.csv
 
+  # batch mode: every PDF in a directory (slides and/or exams)
+  python3 tools/run_pipeline.py --slides-pdf slides/ --out results/mapped_topics_all.csv
+
+In batch mode the page ranges of all PDFs that miss the cache are laid out
+on one process pool (--workers), biggest first, and each deck is written
+to data/slides_topics__<chapter>.txt; matching then works like
+match_topics.py with several --slides files.
+
 Requires: pdfminer.six (for extraction)
+
+Extraction output is cached under .cache/extract, keyed on the PDF contents,
+the extractor parameters and the extractor script, so unchanged PDFs skip
+pdfminer entirely (see --no-cache, --rebuild, --cache-size-mb).
 """
 import argparse
 import importlib
 import os
-import subprocess
 import sys
+from typing import Dict, List, Optional, Tuple, Union
+
+if __package__ in (None, ""):
+    # Run as a script: make the `tools` package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.extract_cache import ExtractionCache
+from tools.match_topics import (
+    chapter_slug,
+    get_normalizer,
+    load_aliases,
+    match_chapters,
+    match_topics,
+    parse_exam,
+    parse_slides,
+    print_summary,
+    score_counters,
+    write_chapters,
+    write_csv,
+)
+from tools.metrics import METRICS, measured
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+EXTRACTORS = {
+    "slides": os.path.join(TOOLS_DIR, "extract_slide_titles.py"),
+    "exam": os.path.join(TOOLS_DIR, "extract_exam_questions.py"),
+}
+# Shared by both extractors, so part of their cache key
+EXTRACTOR_DEPS = [os.path.join(TOOLS_DIR, "layout.py")]
+
+Extracted = Union[List[Tuple[int, str]], List[str]]
 
 
 def ensure_pdfminer() -> bool:
@@ -28,56 +74,425 @@ def ensure_pdfminer() -> bool:
         return False
 
 
+def require_pdfminer() -> None:
+    if not ensure_pdfminer():
+        print("ERROR: pdfminer.six is not installed.")
+        print("Install it first, e.g.:\n  python3 -m pip install pdfminer.six")
+        sys.exit(2)
+
+
+def to_text(kind: str, extracted: Extracted) -> str:
+    """Serialize extractor output in the data/*.txt format."""
+    if kind == "slides":
+        return "".join(f"{page}|{title}\n" for page, title in extracted)
+    return "".join(f"{item}\n" for item in extracted)
+
+
+def text_lines(text: str) -> List[str]:
+    """Lines of to_text() output, split on "\\n" only like load_lines().
+
+    str.splitlines() would also split titles at form feeds, U+2028 and
+    the other Unicode line boundaries.
+    """
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def from_text(kind: str, text: str) -> Extracted:
+    lines = text_lines(text)
+    if kind == "slides":
+        return [(int(page), title) for page, title in (line.split("|", 1) for line in lines)]
+    return lines
+
+
+def layout_region(kind: str, params: Dict[str, float]) -> Optional[float]:
+    """The title region a stage lays out (see tools/layout.py), None for whole pages."""
+    return params["top_ratio"] if kind == "slides" and params.get("fast") else None
+
+
+def shared_slide_params(pdf: str, params: Dict[str, float], exam_pdfs: List[str]) -> Dict[str, float]:
+    """Slide params for pdf, without "fast" if it is also an exam input.
+
+    The exam stage needs the full-page layout of such a PDF anyway, so its
+    titles are read from that table rather than from a second, title-region
+    layout pass.
+    """
+    if params.get("fast") and os.path.realpath(pdf) in {os.path.realpath(p) for p in exam_pdfs}:
+        return {k: v for k, v in params.items() if k != "fast"}
+    return params
+
+
+def extract_stage(kind: str, pdf: str, params: Dict[str, float], layout_cache: Optional[str] = None) -> Extracted:
+    # Imported here so that cache hits never load pdfminer
+    if kind == "slides":
+        from tools.extract_slide_titles import extract_titles
+
+        return extract_titles(pdf, layout_cache=layout_cache, **params)
+    from tools.extract_exam_questions import extract_questions_from_pdf
+
+    return extract_questions_from_pdf(pdf, layout_cache)
+
+
+def run_extractions(
+    stages: Dict[str, Tuple[str, Dict[str, float]]],
+    cache: Optional[ExtractionCache] = None,
+    rebuild: bool = False,
+    concurrent: bool = True,
+    layout_cache: Optional[str] = None,
+) -> Dict[str, Extracted]:
+    """Run the extraction stages ({kind: (pdf, params)}), restoring unchanged PDFs from the cache.
+
+    Stages that miss the cache run concurrently in worker processes. When
+    both stages read the same PDF, it is laid out once, in full (see
+    shared_slide_params()): the slides stage saves its line table to
+    layout_cache (a temporary one if none is given) and the exam stage,
+    run after it, reads the table from there.
+    """
+    if "slides" in stages and "exam" in stages:
+        pdf, params = stages["slides"]
+        stages = dict(stages, slides=(pdf, shared_slide_params(pdf, params, [stages["exam"][0]])))
+    out: Dict[str, Extracted] = {}
+    keys: Dict[str, str] = {}
+    for kind, (pdf, params) in stages.items():
+        if not cache:
+            continue
+        keys[kind] = cache.key(kind, pdf, params, EXTRACTORS[kind], EXTRACTOR_DEPS)
+        text = None if rebuild else cache.get(keys[kind])
+        if text is not None:
+            print(f"Cached {kind} extraction: {pdf}")
+            out[kind] = from_text(kind, text)
+
+    pending = [kind for kind in stages if kind not in out]
+    if not pending:
+        return out
+    require_pdfminer()
+    # Only needed when something is extracted; a cached run stays a light import
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    if rebuild:
+        from tools.layout import discard_cached
+
+        for kind in pending:
+            pdf, params = stages[kind]
+            discard_cached(pdf, layout_cache, layout_region(kind, params))
+
+    shared_pdf = len({os.path.realpath(stages[kind][0]) for kind in pending}) < len(pending)
+    with tempfile.TemporaryDirectory() as tmp:
+        if shared_pdf:
+            layout_cache = layout_cache or tmp
+        if concurrent and len(pending) > 1 and not shared_pdf:
+            with ProcessPoolExecutor(max_workers=len(pending)) as pool:
+                futures = {
+                    kind: pool.submit(
+                        measured, METRICS.settings(), f"extract_{kind}", extract_stage, kind, *stages[kind], layout_cache
+                    )
+                    for kind in pending
+                }
+                for kind, fut in futures.items():
+                    out[kind], delta = fut.result()
+                    METRICS.merge_worker(delta)
+        else:
+            for kind in pending:
+                out[kind] = extract_stage(kind, *stages[kind], layout_cache)
+
+    if cache:
+        for kind in pending:
+            cache.put(keys[kind], to_text(kind, out[kind]))
+    return out
+
+
+def discover_pdfs(path: str) -> List[str]:
+    """The PDFs in a directory (sorted by name), or [path] for a single file."""
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(".pdf"))
+    return [path]
+
+
+def run_batch_extractions(
+    slide_pdfs: List[str],
+    exam_pdfs: List[str],
+    slide_params: Dict[str, float],
+    cache: Optional[ExtractionCache] = None,
+    rebuild: bool = False,
+    workers: int = 1,
+    layout_cache: Optional[str] = None,
+) -> Dict[Tuple[str, str], Extracted]:
+    """Extract many PDFs ({(kind, pdf): result}), restoring unchanged ones from the cache.
+
+    The remaining PDFs are laid out together by build_tables(): their page
+    ranges share one pool of `workers` processes, biggest first, and a PDF
+    that is both a slides and an exam input is laid out once, in full (see
+    shared_slide_params()). Titles and questions are then read from the
+    line tables in this process.
+    """
+    stages = [("slides", pdf, shared_slide_params(pdf, slide_params, exam_pdfs)) for pdf in slide_pdfs]
+    stages += [("exam", pdf, {}) for pdf in exam_pdfs]
+    out: Dict[Tuple[str, str], Extracted] = {}
+    keys: Dict[Tuple[str, str], str] = {}
+    for kind, pdf, params in stages:
+        if not cache:
+            continue
+        keys[(kind, pdf)] = cache.key(kind, pdf, params, EXTRACTORS[kind], EXTRACTOR_DEPS)
+        text = None if rebuild else cache.get(keys[(kind, pdf)])
+        if text is not None:
+            print(f"Cached {kind} extraction: {pdf}")
+            out[(kind, pdf)] = from_text(kind, text)
+
+    pending = [(kind, pdf, params) for kind, pdf, params in stages if (kind, pdf) not in out]
+    if not pending:
+        return out
+    require_pdfminer()
+    # Imported here so that cache hits never load pdfminer
+    from tools.extract_exam_questions import extract_questions_from_table
+    from tools.extract_slide_titles import titles_from_table
+    from tools.layout import build_tables, discard_cached
+
+    jobs = [(pdf, layout_region(kind, params)) for kind, pdf, params in pending]
+    if rebuild:
+        for pdf, region in jobs:
+            discard_cached(pdf, layout_cache, region)
+    tables = build_tables(jobs, workers, layout_cache)
+    for (kind, pdf, params), job in zip(pending, jobs):
+        table = tables[job]
+        if kind == "slides":
+            out[(kind, pdf)] = titles_from_table(table, params["top_ratio"], params["merge_threshold"])
+        else:
+            out[(kind, pdf)] = extract_questions_from_table(table)
+        if cache:
+            cache.put(keys[(kind, pdf)], to_text(kind, out[(kind, pdf)]))
+    return out
+
+
+def write_text(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def run(
+    slides_pdf: str,
+    exam_pdf: str,
+    out: str,
+    slides_out: Optional[str] = None,
+    exam_out: Optional[str] = None,
+    min_score: float = 0.72,
+    max_matches: int = 3,
+    aliases: Optional[str] = None,
+    top_ratio: float = 0.35,
+    merge_threshold: float = 0.9,
+    cache: Optional[ExtractionCache] = None,
+    rebuild: bool = False,
+    concurrent: bool = True,
+    layout_cache: Optional[str] = None,
+    fast_titles: bool = False,
+):
+    """Extract, match and write the mapping CSV in this process.
+
+    Returns match_topics()' (results, unmatched_slides, unmatched_exam).
+    """
+    slide_params = {"top_ratio": top_ratio, "merge_threshold": merge_threshold}
+    if fast_titles:
+        slide_params["fast"] = True
+    with METRICS.stage("extract"):
+        extracted = run_extractions(
+            {
+                "slides": (slides_pdf, slide_params),
+                "exam": (exam_pdf, {}),
+            },
+            cache=cache,
+            rebuild=rebuild,
+            concurrent=concurrent,
+            layout_cache=layout_cache,
+        )
+    METRICS.count("slide_pages", len(extracted["slides"]))
+    METRICS.count("exam_items", len(extracted["exam"]))
+    METRICS.rate("slide_pages_per_sec", len(extracted["slides"]), "extract")
+    if cache:
+        METRICS.count("extraction_cache_hits", cache.hits)
+        METRICS.count("extraction_cache_misses", cache.misses)
+        METRICS.ratio("extraction_cache_hit_rate", cache.hits, cache.hits + cache.misses)
+    slides_text = to_text("slides", extracted["slides"])
+    exam_text = to_text("exam", extracted["exam"])
+    if slides_out:
+        write_text(slides_out, slides_text)
+        print(f"Wrote slide titles: {slides_out}  (pages={len(extracted['slides'])})")
+    if exam_out:
+        write_text(exam_out, exam_text)
+        print(f"Wrote exam items: {exam_out}  (count={len(extracted['exam'])})")
+
+    # Same parsing as match_topics.py applies to the data/*.txt files
+    slides = parse_slides(text_lines(slides_text))
+    exam = parse_exam(text_lines(exam_text))
+    alias_map = load_aliases(aliases)
+    matched = match_topics(slides, exam, alias_map, min_score=min_score, max_matches=max_matches)
+    METRICS.merge(score_counters(get_normalizer(alias_map)))
+    with METRICS.stage("write"):
+        write_csv(matched[0], out)
+    print_summary(out, *matched)
+    return matched
+
+
+def run_batch(
+    slides_pdf: str,
+    exam_pdf: str,
+    out: str,
+    slides_out_dir: Optional[str] = None,
+    exam_out: Optional[str] = None,
+    min_score: float = 0.72,
+    max_matches: int = 3,
+    aliases: Optional[str] = None,
+    top_ratio: float = 0.35,
+    merge_threshold: float = 0.9,
+    cache: Optional[ExtractionCache] = None,
+    rebuild: bool = False,
+    workers: int = 1,
+    layout_cache: Optional[str] = None,
+    fast_titles: bool = False,
+):
+    """run() for directories of PDFs: one chapter per slides PDF, one exam bank from all exam PDFs.
+
+    Writes slides_topics__<chapter>.txt per deck to slides_out_dir, and
+    mapped_topics__<chapter>.csv next to `out` plus the combined CSV.
+    Returns match_chapters()' per-chapter results.
+    """
+    slide_pdfs = discover_pdfs(slides_pdf)
+    exam_pdfs = discover_pdfs(exam_pdf)
+    if not slide_pdfs or not exam_pdfs:
+        print(f"ERROR: no PDFs found in {slides_pdf if not slide_pdfs else exam_pdf}")
+        sys.exit(2)
+    slide_params = {"top_ratio": top_ratio, "merge_threshold": merge_threshold}
+    if fast_titles:
+        slide_params["fast"] = True
+    with METRICS.stage("extract"):
+        extracted = run_batch_extractions(slide_pdfs, exam_pdfs, slide_params, cache, rebuild, workers, layout_cache)
+    n_pages = sum(len(extracted[("slides", pdf)]) for pdf in slide_pdfs)
+    METRICS.count("slide_pdfs", len(slide_pdfs))
+    METRICS.count("slide_pages", n_pages)
+    METRICS.rate("slide_pages_per_sec", n_pages, "extract")
+    if cache:
+        METRICS.count("extraction_cache_hits", cache.hits)
+        METRICS.count("extraction_cache_misses", cache.misses)
+        METRICS.ratio("extraction_cache_hit_rate", cache.hits, cache.hits + cache.misses)
+
+    chapters = []
+    for pdf in slide_pdfs:
+        slides_text = to_text("slides", extracted[("slides", pdf)])
+        if slides_out_dir is not None:
+            path = os.path.join(slides_out_dir, f"slides_topics__{chapter_slug(pdf)}.txt")
+            write_text(path, slides_text)
+            print(f"Wrote slide titles: {path}  (pages={len(extracted[('slides', pdf)])})")
+        chapters.append((chapter_slug(pdf), parse_slides(text_lines(slides_text))))
+    exam_text = "".join(to_text("exam", extracted[("exam", pdf)]) for pdf in exam_pdfs)
+    exam = parse_exam(text_lines(exam_text))
+    METRICS.count("exam_items", len(exam))
+    if exam_out:
+        write_text(exam_out, exam_text)
+        print(f"Wrote exam items: {exam_out}  (count={len(exam)})")
+
+    alias_map = load_aliases(aliases)
+    matched_exam = bytearray(len(exam))
+    with METRICS.stage("score"):
+        per_chapter = match_chapters(
+            chapters, exam, alias_map, min_score=min_score, max_matches=max_matches, workers=workers,
+            matched_exam=matched_exam,
+        )
+    with METRICS.stage("write"):
+        all_rows, unmatched_slides = write_chapters(per_chapter, out)
+    print_summary(out, all_rows, unmatched_slides, [q for q, flag in zip(exam, matched_exam) if not flag])
+    return per_chapter
+
+
 def main():
     ap = argparse.ArgumentParser(description="Run full matching pipeline (extract + match)")
-    ap.add_argument("--slides-pdf", default="KDDM - data - 2.pdf")
-    ap.add_argument("--exam-pdf", default="Exam_Questions_Summary.pdf")
-    ap.add_argument("--slides-out", default="data/slides_topics.txt")
+    ap.add_argument("--slides-pdf", default="KDDM - data - 2.pdf", help="Slides PDF, or a directory of chapter PDFs")
+    ap.add_argument("--exam-pdf", default="Exam_Questions_Summary.pdf", help="Exam PDF, or a directory of exam PDFs")
+    ap.add_argument(
+        "--slides-out",
+        default="data/slides_topics.txt",
+        help="Slide titles file; in batch mode, slides_topics__<chapter>.txt files go to its directory",
+    )
     ap.add_argument("--exam-out", default="data/exam_questions.txt")
+    ap.add_argument("--no-intermediate", action="store_true", help="Do not write --slides-out/--exam-out")
     ap.add_argument("--out", default="results/mapped_topics.csv")
     ap.add_argument("--min-score", type=float, default=0.72)
     ap.add_argument("--max-matches", type=int, default=3)
     ap.add_argument("--aliases", help="Optional JSON synonyms map")
+    ap.add_argument("--top-ratio", type=float, default=0.35, help="Top-of-page ratio to search for titles")
+    ap.add_argument("--merge-threshold", type=float, default=0.9, help="Font size similarity threshold for merging titles")
+    ap.add_argument(
+        "--fast-titles",
+        action="store_true",
+        help="Lay out only the title region of slide pages (see extract_slide_titles.py --compare-fast)",
+    )
+    ap.add_argument("--serial", action="store_true", help="Run the two extractions one after the other")
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Batch mode: worker processes for layout (page ranges of all PDFs) and scoring",
+    )
+    ap.add_argument("--cache-dir", default=".cache/extract", help="Extraction cache directory")
+    ap.add_argument("--cache-size-mb", type=float, default=256, help="Extraction cache size limit (LRU eviction)")
+    ap.add_argument("--no-cache", action="store_true", help="Always run the extractors; do not read or write the cache")
+    ap.add_argument("--rebuild", action="store_true", help="Re-run the extractors (and the pdfminer layout) and refresh the cache entries")
+    ap.add_argument(
+        "--layout-cache",
+        default=".cache/layout",
+        help="Directory of saved pdfminer line tables; lets changed extractor settings skip layout analysis",
+    )
+    ap.add_argument("--metrics", help="Write per-stage timings, pair/alias counters and cache hit rates as JSON")
+    ap.add_argument("--profile", help="Directory for per-stage cProfile dumps (<tool>.<stage>.prof)")
     args = ap.parse_args()
+    METRICS.configure("run_pipeline", args.metrics, args.profile)
 
-    if not ensure_pdfminer():
-        print("ERROR: pdfminer.six is not installed.")
-        print("Install it first, e.g.:\n  python3 -m pip install pdfminer.six")
-        sys.exit(2)
+    cache = None
+    if not args.no_cache:
+        cache = ExtractionCache(args.cache_dir, max_bytes=int(args.cache_size_mb * 1024 * 1024))
 
-    os.makedirs("data", exist_ok=True)
-    os.makedirs("results", exist_ok=True)
-
-    # 1) Extract slide titles
-    subprocess.check_call([
-        sys.executable, "tools/extract_slide_titles.py",
-        "--pdf", args.slides_pdf,
-        "--out", args.slides_out,
-    ])
-
-    # 2) Extract exam items
-    subprocess.check_call([
-        sys.executable, "tools/extract_exam_questions.py",
-        "--pdf", args.exam_pdf,
-        "--out", args.exam_out,
-    ])
-
-    # 3) Match topics to questions
-    cmd = [
-        sys.executable, "tools/match_topics.py",
-        "--slides", args.slides_out,
-        "--exam", args.exam_out,
-        "--out", args.out,
-        "--min-score", str(args.min_score),
-        "--max-matches", str(args.max_matches),
-    ]
-    if args.aliases:
-        cmd.extend(["--aliases", args.aliases])
-    subprocess.check_call(cmd)
+    if os.path.isdir(args.slides_pdf) or os.path.isdir(args.exam_pdf):
+        run_batch(
+            args.slides_pdf,
+            args.exam_pdf,
+            args.out,
+            slides_out_dir=None if args.no_intermediate else os.path.dirname(args.slides_out),
+            exam_out=None if args.no_intermediate else args.exam_out,
+            min_score=args.min_score,
+            max_matches=args.max_matches,
+            aliases=args.aliases,
+            top_ratio=args.top_ratio,
+            merge_threshold=args.merge_threshold,
+            cache=cache,
+            rebuild=args.rebuild,
+            workers=1 if args.serial else args.workers,
+            layout_cache=None if args.no_cache else args.layout_cache,
+            fast_titles=args.fast_titles,
+        )
+    else:
+        run(
+            args.slides_pdf,
+            args.exam_pdf,
+            args.out,
+            slides_out=None if args.no_intermediate else args.slides_out,
+            exam_out=None if args.no_intermediate else args.exam_out,
+            min_score=args.min_score,
+            max_matches=args.max_matches,
+            aliases=args.aliases,
+            top_ratio=args.top_ratio,
+            merge_threshold=args.merge_threshold,
+            cache=cache,
+            rebuild=args.rebuild,
+            concurrent=not args.serial,
+            layout_cache=None if args.no_cache else args.layout_cache,
+            fast_titles=args.fast_titles,
+        )
 
+    METRICS.rate("pairs_per_sec", METRICS.counters.get("pairs", 0), "score")
+    METRICS.write(args.metrics)
     print("\nDone. Open:", args.out)
 
 
 if __name__ == "__main__":
     main()
-
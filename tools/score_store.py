@@ -0,0 +1,57 @@
+"""
+Persistent per-pair score store for incremental re-matching.
+
+Scores depend only on the two normalized texts, so pairs are keyed by hashes
+of the normalized topic and question. Adding a question or a slide title
+only scores the new pairs; changing the aliases only re-scores texts whose
+normalization actually changed, because unchanged texts keep their hash.
+
+A stored score is either exact, or an upper bound below the --min-score of
+the run that produced it (the pair was pruned by bounded_char_similarity()).
+Bounds are reused as long as they stay below the current --min-score.
+"""
+import hashlib
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+
+
+class ScoreStore:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pairs ("
+            " topic TEXT NOT NULL, question TEXT NOT NULL, score REAL NOT NULL, exact INTEGER NOT NULL,"
+            " PRIMARY KEY (topic, question)) WITHOUT ROWID"
+        )
+        self.reused = 0
+        self.scored = 0
+
+    def load(self, topic_hashes: Iterable[str]) -> Dict[Tuple[str, str], Tuple[float, bool]]:
+        """Stored (score, exact) for every pair of the given topics."""
+        out: Dict[Tuple[str, str], Tuple[float, bool]] = {}
+        hashes = sorted(set(topic_hashes))
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT topic, question, score, exact FROM pairs WHERE topic IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for topic, question, score, exact in rows:
+                out[(topic, question)] = (score, bool(exact))
+        return out
+
+    def save(self, rows: List[Tuple[str, str, float, bool]]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pairs (topic, question, score, exact) VALUES (?, ?, ?, ?)",
+                [(t, q, s, int(e)) for t, q, s, e in rows],
+            )
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,199 @@
+"""
+Text embeddings and a brute-force cosine index for --engine semantic.
+
+Two local, offline embedders:
+  - "lsa": TF-IDF over words and in-word character trigrams, reduced with a
+    truncated SVD. It is fitted once on the run's corpus (exam questions plus
+    all slide topics) and saved to CACHE_DIR/lsa-<dim>.npz. Later runs fold
+    new texts into that model's fixed vocabulary, so its model id, and with
+    it the embedding cache, stays the same when inputs change. It is refitted
+    on --refit, or when more than UNSEEN_REFIT of the corpus' feature
+    occurrences are missing from its vocabulary.
+  - a sentence-transformers model directory (only if that package is
+    installed; the model is loaded from disk, nothing is downloaded).
+
+Vectors are L2-normalized and cached on disk per model, keyed by the hash of
+the normalized text (CACHE_DIR/<model id>.npz), so repeated runs only embed
+texts that were not seen before. The cached exam matrix doubles as the
+vector index: top_k() is an exact NumPy search by cosine similarity.
+
+Requires numpy and scipy.
+"""
+import hashlib
+import math
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .score_store import text_hash
+except ImportError:  # run as a script
+    from score_store import text_hash
+
+
+def features(text: str) -> List[str]:
+    """Words plus character trigrams of each padded word ("#" marks n-gram features)."""
+    out: List[str] = []
+    for word in text.split():
+        out.append(word)
+        padded = f" {word} "
+        out.extend("#" + padded[i:i + 3] for i in range(len(padded) - 2))
+    return out
+
+
+def l2_normalize(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+class LsaModel:
+    def __init__(self, vocab: List[str], idf: np.ndarray, components: np.ndarray):
+        self.vocab = vocab
+        self.index = {f: i for i, f in enumerate(vocab)}
+        self.idf = idf
+        self.components = components  # dim x vocab
+        digest = hashlib.sha1(components.tobytes()).hexdigest()[:12]
+        self.model_id = f"lsa-{components.shape[0]}-{digest}"
+
+    @classmethod
+    def fit(cls, texts: List[str], dim: int = 128) -> "LsaModel":
+        from scipy.sparse.linalg import svds
+
+        df: Counter = Counter()
+        for text in texts:
+            df.update(set(features(text)))
+        vocab = sorted(df)
+        n = len(texts)
+        idf = np.array([math.log((1 + n) / (1 + df[f])) + 1.0 for f in vocab])
+        model = cls(vocab, idf, np.zeros((0, len(vocab))))
+        X = model.tfidf(texts)
+        k = max(1, min(dim, min(X.shape) - 1))
+        # Fixed start vector: the same corpus always yields the same model
+        _, s, vt = svds(X, k=k, v0=np.ones(min(X.shape)) / math.sqrt(min(X.shape)))
+        return cls(vocab, idf, vt[np.argsort(-s)])
+
+    def tfidf(self, texts: List[str]):
+        from scipy import sparse
+
+        rows: List[int] = []
+        cols: List[int] = []
+        data: List[float] = []
+        for r, text in enumerate(texts):
+            counts = Counter(f for f in features(text) if f in self.index)
+            weights = {self.index[f]: (1.0 + math.log(c)) * self.idf[self.index[f]] for f, c in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for col, w in weights.items():
+                rows.append(r)
+                cols.append(col)
+                data.append(w / norm)
+        return sparse.csr_matrix((data, (rows, cols)), shape=(len(texts), len(self.vocab)))
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return l2_normalize(np.asarray(self.tfidf(texts) @ self.components.T))
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, vocab=np.array(self.vocab), idf=self.idf, components=self.components)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LsaModel":
+        with np.load(path) as z:
+            return cls(z["vocab"].tolist(), z["idf"], z["components"])
+
+
+class LocalModel:
+    """A sentence-transformers model loaded from a local directory."""
+
+    def __init__(self, path: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(path, device="cpu")
+        name = os.path.basename(os.path.normpath(path))
+        self.model_id = f"st-{name}-{hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float64)
+
+
+UNSEEN_REFIT = 0.25
+
+
+def unseen_fraction(model: LsaModel, corpus: List[str]) -> float:
+    """Share of the corpus' feature occurrences that are not in the model's vocabulary."""
+    total = unseen = 0
+    for text in set(corpus):
+        for f in features(text):
+            total += 1
+            unseen += f not in model.index
+    return unseen / total if total else 0.0
+
+
+def load_model(model: str, cache_dir: str, corpus: List[str], dim: int = 128, refit: bool = False):
+    """The saved "lsa" model (fitted on corpus if missing, stale or refit) or a local sentence-transformers model."""
+    if model != "lsa":
+        return LocalModel(model)
+    path = os.path.join(cache_dir, f"lsa-{dim}.npz")
+    old = LsaModel.load(path) if os.path.exists(path) else None
+    if old is not None and not refit and unseen_fraction(old, corpus) <= UNSEEN_REFIT:
+        return old
+    lsa = LsaModel.fit(corpus, dim=dim)
+    lsa.save(path)
+    if old is not None and old.model_id != lsa.model_id:
+        # Vectors of the replaced model can never be used again
+        stale = os.path.join(cache_dir, f"{old.model_id}.npz")
+        if os.path.exists(stale):
+            os.remove(stale)
+    return lsa
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: str, model_id: str):
+        self.path = os.path.join(cache_dir, f"{model_id}.npz")
+        self.rows: Dict[str, int] = {}
+        self.vectors: Optional[np.ndarray] = None
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(self.path):
+            with np.load(self.path) as z:
+                self.rows = {h: i for i, h in enumerate(z["hashes"].tolist())}
+                self.vectors = z["vectors"]
+
+    def embed(self, model, texts: List[str]) -> np.ndarray:
+        """Vectors for texts (one row each), embedding and storing only the unseen ones."""
+        hashes = [text_hash(t) for t in texts]
+        missing = sorted({h: t for h, t in zip(hashes, texts) if h not in self.rows}.items())
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        if missing:
+            new = model.embed([t for _, t in missing])
+            start = len(self.rows)
+            self.rows.update((h, start + i) for i, (h, _) in enumerate(missing))
+            self.vectors = new if self.vectors is None else np.vstack([self.vectors, new])
+            self.save()
+        if not texts:
+            return np.zeros((0, 0))
+        return self.vectors[[self.rows[h] for h in hashes]]
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, hashes=np.array(list(self.rows)), vectors=self.vectors)
+        os.replace(tmp, self.path)
+
+
+def top_k(queries: np.ndarray, index: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k by cosine (rows are unit vectors): (indices, similarities), each queries x k, best first."""
+    sims = queries @ index.T
+    k = min(k, index.shape[0])
+    if k < index.shape[0]:
+        part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(index.shape[0]), (len(queries), 1))
+    part_sims = np.take_along_axis(sims, part, axis=1)
+    order = np.argsort(-part_sims, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_sims, order, axis=1)